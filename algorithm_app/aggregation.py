@@ -0,0 +1,20 @@
+from typing import Any, Hashable, Iterable
+
+
+def group_sum(keys: Iterable[Hashable], values: Iterable[Any]) -> dict:
+    """Sums the values of every key in a single pass, keeping keys in first seen order."""
+    totals = {}
+    for key, value in zip(keys, values):
+        if key in totals:
+            totals[key] += value
+        else:
+            totals[key] = value
+    return totals
+
+
+def index_by(objects: Iterable[dict], key_name: str) -> dict:
+    """Builds the hash side of a join: maps each key to the first object holding it."""
+    index = {}
+    for single_object in objects:
+        index.setdefault(single_object[key_name], single_object)
+    return index
@@ -1,9 +1,11 @@
-from .utils import annotate, append_to_json_file, read_from_ndjson_file
+from .utils import annotate, append_to_json_file, read_from_ndjson_file, read_link_batch_from_ndjson_file
 from .pipeline import Pipeline
 from .filters import *
 
 import os
 import yaml
+import asyncio
+import aiohttp
 
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_FILE_PATH = os.path.join(APP_DIR, 'config.yaml')
@@ -14,28 +16,79 @@ with open(CONFIG_FILE_PATH, 'r') as file:
 URL_COLUMN_NAME = config['analyser']['url_column_name']
 NUM_OCCURRENCES_COLUMN_NAME = config['analyser']['num_occurrences_column_name']
 LOCATION_COLUMN_NAME = config['analyser']['location_column_name']
+DOMAIN_COLUMN_NAME = config['analyser']['domain_column_name']
+COLUMNAR_LINKS: bool = config['analyser']['columnar_links']
+PRIORITY: dict = config['analyser']['priority']
+PIPELINE_MODE: str = config['pipeline']['mode']
+PIPELINE_STREAM_BATCH_SIZE: int = config['pipeline']['stream_batch_size']
+PIPELINE_EXECUTOR: str = config['pipeline']['executor']
+PIPELINE_MAX_WORKERS: int = config['pipeline']['max_workers']
+PIPELINE_RELEASE_INTERMEDIATE_RESULTS: bool = config['pipeline']['release_intermediate_results']
+PIPELINE_SPILL_DIR: str | None = config['pipeline']['spill_dir']
+PIPELINE_FUSE_ROW_FILTERS: bool = config['pipeline']['fuse_row_filters']
+ENRICHMENT_STORE: dict = config['enrichment_store']
+ENRICHMENT_STORE_FILE_PATH = os.path.join(config['directories']['cache_dir'], ENRICHMENT_STORE['file'])
 
 
 class SieveAnalyser:
     def __init__(self, links_filepath, analyser_results_filepath, whitelist_words):
         self.links_filepath = links_filepath
         self.whitelist_words = whitelist_words
-        self.links_objects = read_from_ndjson_file(links_filepath)
+        if COLUMNAR_LINKS:
+            self.links_objects = read_link_batch_from_ndjson_file(links_filepath, [LOCATION_COLUMN_NAME, DOMAIN_COLUMN_NAME])
+        else:
+            self.links_objects = read_from_ndjson_file(links_filepath)
         self.analyser_results_filepath = analyser_results_filepath
 
-    @annotate
-    def run(self):
+    def __create_pipeline(self, session: aiohttp.ClientSession = None) -> Pipeline:
+        enrichment_store = DomainEnrichmentStore(ENRICHMENT_STORE_FILE_PATH, ENRICHMENT_STORE['ttl']) \
+            if ENRICHMENT_STORE['enabled'] else None
         filters = [
-            [1, [0], RegularizeLinksFilter(URL_COLUMN_NAME, 'www.')],
-            [2, [1], OccurrencesCountFilter(URL_COLUMN_NAME, NUM_OCCURRENCES_COLUMN_NAME)],
-            [3, [1], LocationGroupingFilter(URL_COLUMN_NAME, LOCATION_COLUMN_NAME)],
+            [1, [0], RegularizeLinksFilter(URL_COLUMN_NAME, 'www.', DOMAIN_COLUMN_NAME)],
+            [2, [1], OccurrencesCountFilter(URL_COLUMN_NAME, NUM_OCCURRENCES_COLUMN_NAME, DOMAIN_COLUMN_NAME)],
+            [3, [1], LocationGroupingFilter(URL_COLUMN_NAME, LOCATION_COLUMN_NAME, DOMAIN_COLUMN_NAME)],
             [4, [3], BlacklistFilter(URL_COLUMN_NAME)],
-            [5, [4], DeduplicationFilter(URL_COLUMN_NAME)],
-            [6, [5, 2], MatchOccurrencesCountFilter(URL_COLUMN_NAME, NUM_OCCURRENCES_COLUMN_NAME, LOCATION_COLUMN_NAME)],
-            [7, [6], WebsiteDataExtractionFilter(URL_COLUMN_NAME, NUM_OCCURRENCES_COLUMN_NAME, LOCATION_COLUMN_NAME)],
-            [8, [7], ExtractContactInformationFilter()],
-            [9, [8], TranslationFilter(URL_COLUMN_NAME)],
-            [10, [9], CheckMetadataFilter(self.whitelist_words)],
+            [5, [4], DeduplicationFilter(URL_COLUMN_NAME, DOMAIN_COLUMN_NAME)],
+            [6, [5, 2], MatchOccurrencesCountFilter(URL_COLUMN_NAME, NUM_OCCURRENCES_COLUMN_NAME, LOCATION_COLUMN_NAME,
+                                                    DOMAIN_COLUMN_NAME)],
+            *([[11, [6], PriorityOrderFilter(NUM_OCCURRENCES_COLUMN_NAME)]] if PRIORITY['enabled'] else []),
+            # Fetching, contact extraction and translation only run for domains without fresh stored results.
+            [7, [11] if PRIORITY['enabled'] else [6], DomainEnrichmentFilter([
+                WebsiteDataExtractionFilter(URL_COLUMN_NAME, NUM_OCCURRENCES_COLUMN_NAME, LOCATION_COLUMN_NAME,
+                                            batch_size=PIPELINE_STREAM_BATCH_SIZE,
+                                            time_budget=PRIORITY['time_budget'] if PRIORITY['enabled'] else None,
+                                            session=session),
+                ExtractContactInformationFilter(),
+                TranslationFilter(URL_COLUMN_NAME, batch_size=PIPELINE_STREAM_BATCH_SIZE),
+            ], enrichment_store, URL_COLUMN_NAME, DOMAIN_COLUMN_NAME)],
+            [8, [7], CheckMetadataFilter(self.whitelist_words)],
+            *([[12, [8], TopKFilter('metadata_contains_key_words', "True", PRIORITY['top_k'], PRIORITY['time_budget'])]]
+              if PRIORITY['enabled'] else []),
         ]
-        pipeline = Pipeline(filters, self.links_objects)
-        append_to_json_file(pipeline.run(), self.analyser_results_filepath)
+        return Pipeline(filters, self.links_objects, PIPELINE_EXECUTOR, PIPELINE_MAX_WORKERS,
+                        PIPELINE_RELEASE_INTERMEDIATE_RESULTS, PIPELINE_SPILL_DIR, PIPELINE_FUSE_ROW_FILTERS)
+
+    @annotate
+    def run(self):
+        pipeline = self.__create_pipeline()
+        # Stopping early only saves work when the filters before TopKFilter are pulled lazily.
+        if PIPELINE_MODE == 'streaming' or PRIORITY['enabled']:
+            append_to_json_file(pipeline.stream(), self.analyser_results_filepath)
+        else:
+            append_to_json_file(pipeline.run(), self.analyser_results_filepath)
+
+    @annotate
+    async def arun(self, session: aiohttp.ClientSession = None):
+        """
+        Runs the analysis on the caller's event loop, so several analyses can share one loop and its fetch and
+        translation I/O; CPU and SQLite work runs in worker threads. Analyses given the same session, created with
+        create_client_session on that loop and closed by the caller, share one connection pool as well. Only in batch
+        mode: the streaming pipeline, used in streaming and priority mode, pulls its filters synchronously, so it runs
+        in a worker thread of its own, where every streaming network filter drives an event loop and session of its
+        own.
+        """
+        if PIPELINE_MODE == 'streaming' or PRIORITY['enabled']:
+            await asyncio.to_thread(self.run)
+        else:
+            link_objects = await self.__create_pipeline(session).arun()
+            await asyncio.to_thread(append_to_json_file, link_objects, self.analyser_results_filepath)
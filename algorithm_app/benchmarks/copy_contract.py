@@ -0,0 +1,85 @@
+"""
+Compares allocations of the row-wise analyser filters under the copy-free link object contract against the
+previous contract, where every filter started by deep copying its input.
+
+Run with: python -m algorithm_app.benchmarks.copy_contract [num_links] [text_size]
+"""
+from copy import deepcopy
+
+import sys
+import time
+import tracemalloc
+
+from ..filters import (BasicFilter, BlacklistFilter, CheckMetadataFilter, DeduplicationFilter,
+                       ExtractContactInformationFilter, RegularizeLinksFilter)
+
+
+class DeepCopyingFilter(BasicFilter):
+    """Restores the previous contract by deep copying the input before handing it to the wrapped filter."""
+
+    def __init__(self, pipeline_filter: BasicFilter):
+        super().__init__()
+        self.__pipeline_filter = pipeline_filter
+
+    def run(self, link_objects: list[dict]) -> list[dict]:
+        return super().run(self.__pipeline_filter.run(deepcopy(link_objects)))
+
+
+def create_link_objects(num_links: int, text_size: int) -> list[dict]:
+    page_text = ('Our point of sale platform helps restaurants take orders faster. ' * (text_size // 65 + 1))[:text_size]
+    page_text += ' Call us on +44 20 7946 0958 or write to sales@example.com.'
+    return [
+        {
+            'url': f'https://www.site{index}.com/page',
+            'loc': ['United Kingdom'],
+            'num_occurrences': 1,
+            'title': f'Point of sale system {index}',
+            'description': 'Cloud based POS for restaurants',
+            'text': f'{page_text} {index}'
+        } for index in range(num_links)
+    ]
+
+
+def create_filters() -> list[BasicFilter]:
+    return [
+        RegularizeLinksFilter('url', 'www.'),
+        BlacklistFilter('url'),
+        DeduplicationFilter('url'),
+        ExtractContactInformationFilter(),
+        CheckMetadataFilter(['pos']),
+    ]
+
+
+def measure(pipeline_filters: list[BasicFilter], link_objects: list[dict]) -> dict:
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result_link_objects = link_objects
+    for pipeline_filter in pipeline_filters:
+        result_link_objects = pipeline_filter.run(result_link_objects)
+    elapsed_time = time.perf_counter() - start_time
+    snapshot = tracemalloc.take_snapshot()
+    _, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    statistics = snapshot.statistics('filename')
+    return {
+        'seconds': elapsed_time,
+        'allocated_blocks': sum(statistic.count for statistic in statistics),
+        'retained_mb': sum(statistic.size for statistic in statistics) / 2 ** 20,
+        'peak_mb': peak_size / 2 ** 20,
+    }
+
+
+def main(num_links: int = 5000, text_size: int = 20000) -> None:
+    link_objects = create_link_objects(num_links, text_size)
+    results = {
+        'deepcopy per filter': measure([DeepCopyingFilter(f) for f in create_filters()], link_objects),
+        'copy-free': measure(create_filters(), link_objects),
+    }
+    print(f"{num_links} links, {text_size} characters of page text each")
+    for name, result in results.items():
+        print(f"{name:>20}: {result['seconds']:.2f}s, {result['allocated_blocks']} live blocks, "
+              f"{result['retained_mb']:.1f} MB retained, {result['peak_mb']:.1f} MB peak")
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:3]])
@@ -0,0 +1,83 @@
+"""
+Compares TranslationFilter with one translator request per text against packed requests of the Google backend, with
+its client replaced by a fake translator that charges a fixed round trip per request plus a small cost per character,
+and that now and then loses the separators of a packed request to exercise the per text fallback.
+
+Run with: python -m algorithm_app.benchmarks.packed_translation [num_links] [round_trip_ms]
+"""
+from types import SimpleNamespace
+
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+
+from ..filters import TranslationFilter
+from ..filters.translation_backends import GoogleTranslationBackend
+from ..filters.translation_cache import TranslationCache
+
+
+class FakeTranslator:
+    def __init__(self, round_trip: float, seconds_per_character: float = 2e-6, separator_loss_rate: float = 0.05):
+        self.round_trip = round_trip
+        self.seconds_per_character = seconds_per_character
+        self.separator_loss_rate = separator_loss_rate
+        self.requests = 0
+        self.__random = random.Random(0)
+
+    async def translate(self, text: str, src: str = 'auto', dest: str = 'en') -> SimpleNamespace:
+        self.requests += 1
+        await asyncio.sleep(self.round_trip + len(text) * self.seconds_per_character)
+        translated_text = text.upper()
+        if '\n' in text and self.__random.random() < self.separator_loss_rate:
+            translated_text = translated_text.replace('\n', ' ', 1)
+        return SimpleNamespace(text=translated_text)
+
+
+def create_link_objects(num_links: int) -> list[dict]:
+    return [
+        {
+            'url': f'https://www.site{index}.com/',
+            'title': f'Sistema de punto de venta {index}',
+            'description': f'Software TPV en la nube para restaurantes y tiendas número {index}',
+        } for index in range(num_links)
+    ]
+
+
+def measure(link_objects: list[dict], max_batch_items: int, round_trip: float, concurrency_limit: int) -> dict:
+    fake_translator = FakeTranslator(round_trip)
+    backend = GoogleTranslationBackend([], max_batch_items=max_batch_items, translator=fake_translator)
+    # An empty cache of its own per measurement, translations cached by earlier runs would hide the requests.
+    with tempfile.TemporaryDirectory() as cache_dir:
+        translation_cache = TranslationCache(os.path.join(cache_dir, 'translations.sqlite3'), 0, len(link_objects) * 2)
+        pipeline_filter = TranslationFilter('url', concurrency_limit=concurrency_limit, batch_size=len(link_objects),
+                                            translation_cache=translation_cache, backend=backend)
+        start_time = time.perf_counter()
+        result_link_objects = pipeline_filter.run(link_objects)
+        seconds = time.perf_counter() - start_time
+        translation_cache.close()
+    return {
+        'seconds': seconds,
+        'requests': fake_translator.requests,
+        'fallbacks': pipeline_filter.packed_fallbacks,
+        'translated': sum(1 for link_object in result_link_objects if link_object['title'].isupper()),
+    }
+
+
+def main(num_links: int = 2000, round_trip_ms: int = 100, concurrency_limit: int = 10) -> None:
+    link_objects = create_link_objects(num_links)
+    round_trip = round_trip_ms / 1000
+    results = {
+        'one request per text': measure(link_objects, 1, round_trip, concurrency_limit),
+        'packed requests': measure(link_objects, 50, round_trip, concurrency_limit),
+    }
+    print(f"{num_links} links, {round_trip_ms} ms round trip, {concurrency_limit} concurrent requests")
+    for name, result in results.items():
+        print(f"{name:>22}: {result['seconds']:.2f}s, {result['requests']} requests, "
+              f"{result['fallbacks']} packs split up, {result['translated']} titles translated")
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:3]])
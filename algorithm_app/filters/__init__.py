@@ -1,4 +1,4 @@
-from .basic_filter import BasicFilter
+from .basic_filter import BasicFilter, with_fields
 from .blacklist_filter import BlacklistFilter
 from .regularize_links_filter import RegularizeLinksFilter
 from .occurrences_count_filter import OccurrencesCountFilter
@@ -6,11 +6,18 @@ from .match_occurences_count_filter import MatchOccurrencesCountFilter
 from .deduplication_filter import DeduplicationFilter
 from .location_grouping_filter import LocationGroupingFilter
 from .website_data_extraction_filter import WebsiteDataExtractionFilter
-from .request_adapter import RequestAdapter
+from .request_adapter import RequestAdapter, create_client_session
 from .translation_filter import TranslationFilter
 from .check_metadata_filter import CheckMetadataFilter
 from .extract_contact_information_filter import ExtractContactInformationFilter
+from .fused_filter import FusedFilter
+from .enrichment_store import DomainEnrichmentStore
+from .domain_enrichment_filter import DomainEnrichmentFilter
+from .priority_order_filter import PriorityOrderFilter
+from .top_k_filter import TopKFilter
 
-__all__ = ["BasicFilter", "BlacklistFilter", "RegularizeLinksFilter", "OccurrencesCountFilter",
+__all__ = ["BasicFilter", "with_fields", "BlacklistFilter", "RegularizeLinksFilter", "OccurrencesCountFilter",
            "MatchOccurrencesCountFilter", "DeduplicationFilter", "LocationGroupingFilter",
-           "WebsiteDataExtractionFilter", "RequestAdapter", "TranslationFilter", "CheckMetadataFilter", "ExtractContactInformationFilter"]
\ No newline at end of file
+           "WebsiteDataExtractionFilter", "RequestAdapter", "create_client_session", "TranslationFilter", "CheckMetadataFilter", "ExtractContactInformationFilter",
+           "FusedFilter", "DomainEnrichmentStore", "DomainEnrichmentFilter",
+           "PriorityOrderFilter", "TopKFilter"]
\ No newline at end of file
@@ -1,7 +1,35 @@
+from typing import Iterable, Iterator
+
+import asyncio
+
+
+def with_fields(link_object: dict, fields: dict) -> dict:
+    """Returns a new link object with the given fields replaced, sharing every other value with the original."""
+    return {**link_object, **fields}
+
+
 class BasicFilter:
+    # Streaming filters consume their first input lazily; the rest are barriers that need the whole input.
+    streaming = False
+    # Row local filters look at one link object at a time and may be fused with their neighbours into one pass.
+    row_local = False
+    # Asynchronous filters do their I/O in arun on the caller's event loop, so the pipeline awaits them alongside
+    # each other instead of handing them to its executor, where every call would start an event loop of its own.
+    asynchronous = False
+
+    # Link objects handed to a filter are owned by the pipeline and must never be mutated in place, neither the
+    # objects nor the values they hold. Filters derive changed objects with with_fields and pass unchanged ones on.
+
     def __init__(self, result_link_objects: list[dict] = None):
         self.result_link_objects = result_link_objects
 
     def run(self, link_objects: list[dict]) -> list[dict]:
         self.result_link_objects = link_objects
         return self.result_link_objects
+
+    def stream(self, link_objects: Iterable[dict], *params: list[dict]) -> Iterator[dict]:
+        yield from self.run(list(link_objects), *params)
+
+    async def arun(self, link_objects: list[dict], *params: list[dict]) -> list[dict]:
+        # Synchronous filters awaited by an asynchronous one must not hold up the other work on its event loop.
+        return await asyncio.to_thread(self.run, link_objects, *params)
@@ -1,5 +1,9 @@
-from copy import deepcopy
+from functools import lru_cache
+from typing import Iterable, Iterator
 from .basic_filter import BasicFilter
+from ..link_batch import LinkBatch
+from ..pattern_matching import AhoCorasickMatcher, DomainSuffixTrie
+from ..url_normalization import parse_url
 
 import os
 import yaml
@@ -11,17 +15,58 @@ with open(CONFIG_FILE_PATH, 'r') as file:
     config: dict = yaml.safe_load(file)
 
 BLACKLIST_WORDS = config['blacklist_filter']['link_words']
+BLACKLIST_WORDS_FILE: str | None = config['blacklist_filter']['link_words_file']
+BLACKLIST_DOMAINS = config['blacklist_filter']['domains']
+BLACKLIST_DOMAINS_FILE: str | None = config['blacklist_filter']['domains_file']
+
+
+def read_blacklist_file(filepath: str | None) -> list[str]:
+    if not filepath:
+        return []
+    with open(os.path.join(APP_DIR, '..', filepath), 'r', encoding='utf-8') as blacklist_file:
+        return [line.strip() for line in blacklist_file if line.strip() and not line.startswith('#')]
+
+
+class BlacklistMatcher:
+    def __init__(self, link_words: Iterable[str], domains: Iterable[str]):
+        self.__link_words_matcher = AhoCorasickMatcher(link_words)
+        self.__domains_trie = DomainSuffixTrie(domains)
+
+    def is_blacklisted(self, link: str) -> bool:
+        return self.__link_words_matcher.contains_any(link) or self.__domains_trie.matches(parse_url(link).host)
+
+
+@lru_cache(maxsize=None)
+def load_blacklist_matcher(link_words: tuple[str, ...] = tuple(BLACKLIST_WORDS),
+                           link_words_file: str | None = BLACKLIST_WORDS_FILE,
+                           domains: tuple[str, ...] = tuple(BLACKLIST_DOMAINS),
+                           domains_file: str | None = BLACKLIST_DOMAINS_FILE) -> BlacklistMatcher:
+    """Compiles the blacklist once per process; files are resolved relative to algorithm_app."""
+    return BlacklistMatcher([*link_words, *read_blacklist_file(link_words_file)],
+                            [*domains, *read_blacklist_file(domains_file)])
 
 
 class BlacklistFilter(BasicFilter):
+    streaming = True
+    row_local = True
 
-    def __init__(self, url_column_name: str):
+    def __init__(self, url_column_name: str, blacklist_matcher: BlacklistMatcher = None):
         super().__init__()
         self.__url_column_name = url_column_name
+        self.__blacklist_matcher = blacklist_matcher or load_blacklist_matcher()
 
     def __is_containing_blacklist_words(self, link: str) -> bool:
-        return any(blacklist_word in link for blacklist_word in BLACKLIST_WORDS)
+        return self.__blacklist_matcher.is_blacklisted(link)
+
+    def stream(self, link_objects: Iterable[dict]) -> Iterator[dict]:
+        for link_object in link_objects:
+            if not self.__is_containing_blacklist_words(link_object[self.__url_column_name]):
+                yield link_object
 
     def run(self, link_objects: list[dict]) -> list[dict]:
-        updated_link_objects = deepcopy(link_objects)
-        return super().run([link_object for link_object in updated_link_objects if not self.__is_containing_blacklist_words(link_object[self.__url_column_name])])
+        if isinstance(link_objects, LinkBatch):
+            return super().run(link_objects.take(
+                index for index, link in enumerate(link_objects.column(self.__url_column_name))
+                if not self.__is_containing_blacklist_words(link)
+            ))
+        return super().run(list(self.stream(link_objects)))
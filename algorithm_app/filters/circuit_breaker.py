@@ -0,0 +1,59 @@
+import time
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host after consecutive failures. Once the reset timeout has passed a single probe
+    request is let through; its success closes the breaker again, its failure keeps it open for another period.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow_request(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class HostCircuitBreakers:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.circuit_breakers: dict[str, CircuitBreaker] = {}
+
+    def __circuit_breaker(self, host: str) -> CircuitBreaker:
+        if host not in self.circuit_breakers:
+            self.circuit_breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self.circuit_breakers[host]
+
+    def allow_request(self, host: str) -> bool:
+        return self.__circuit_breaker(host).allow_request()
+
+    def record(self, host: str, success: bool) -> None:
+        if success:
+            self.__circuit_breaker(host).record_success()
+        else:
+            self.__circuit_breaker(host).record_failure()
+
+    def statistics(self) -> dict:
+        return {"open_circuit_breakers": sum(1 for breaker in self.circuit_breakers.values() if breaker.is_open)}
@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency window following additive increase / multiplicative decrease: every healthy response grows the
+    window by about one slot per window's worth of responses, every congestion signal halves it (at most once per
+    cooldown, so a burst of failures from the same congestion episode only counts once).
+    """
+
+    def __init__(self, initial_window: int, min_window: int, max_window: int, adaptive: bool = True,
+                 decrease_factor: float = 0.5, cooldown: float = 1.0):
+        self.min_window = min_window
+        self.max_window = max_window
+        self.window = float(max_window if not adaptive else min(max(initial_window, min_window), max_window))
+        self.adaptive = adaptive
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.decreases = 0
+        self.__last_decrease = 0.0
+        self.__condition = None
+        self.__loop = None
+
+    async def acquire(self) -> None:
+        if self.__loop is not asyncio.get_running_loop():
+            # The window outlives a single asyncio.run, but the condition has to belong to the current loop.
+            self.__loop = asyncio.get_running_loop()
+            self.__condition = asyncio.Condition()
+        async with self.__condition:
+            await self.__condition.wait_for(lambda: self.in_flight < int(self.window))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self.__condition:
+            self.in_flight -= 1
+            self.__condition.notify_all()
+
+    def record_success(self) -> None:
+        if self.adaptive:
+            self.window = min(self.max_window, self.window + 1 / self.window)
+
+    def record_congestion(self) -> None:
+        now = time.monotonic()
+        if self.adaptive and now - self.__last_decrease >= self.cooldown:
+            self.window = max(self.min_window, self.window * self.decrease_factor)
+            self.__last_decrease = now
+            self.decreases += 1
+
+
+class AimdConcurrencyController:
+    """Adaptive concurrency limits for fetching websites, one window shared by all hosts and one window per host."""
+
+    def __init__(self, initial_concurrency: int, min_concurrency: int, max_concurrency: int,
+                 initial_concurrency_per_host: int, min_concurrency_per_host: int, max_concurrency_per_host: int,
+                 adaptive: bool = True, decrease_factor: float = 0.5, latency_threshold: float = 10.0,
+                 congestion_cooldown: float = 1.0):
+        self.__host_limits = (initial_concurrency_per_host, min_concurrency_per_host, max_concurrency_per_host)
+        self.adaptive = adaptive
+        self.decrease_factor = decrease_factor
+        self.latency_threshold = latency_threshold
+        self.congestion_cooldown = congestion_cooldown
+        self.global_limiter = AdaptiveLimiter(initial_concurrency, min_concurrency, max_concurrency,
+                                              adaptive, decrease_factor, congestion_cooldown)
+        self.host_limiters: dict[str, AdaptiveLimiter] = {}
+
+    def __host_limiter(self, host: str) -> AdaptiveLimiter:
+        if host not in self.host_limiters:
+            self.host_limiters[host] = AdaptiveLimiter(*self.__host_limits, self.adaptive, self.decrease_factor,
+                                                       self.congestion_cooldown)
+        return self.host_limiters[host]
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        # The host slot is taken first, so requests queued behind a busy host do not hold global capacity.
+        host_limiter = self.__host_limiter(host)
+        await host_limiter.acquire()
+        try:
+            await self.global_limiter.acquire()
+            try:
+                yield
+            finally:
+                await self.global_limiter.release()
+        finally:
+            await host_limiter.release()
+
+    def record(self, host: str, latency: float, congested: bool) -> None:
+        """Feeds back one request outcome; slow but successful responses hold the windows where they are."""
+        host_limiter = self.__host_limiter(host)
+        if congested:
+            host_limiter.record_congestion()
+            self.global_limiter.record_congestion()
+        elif latency <= self.latency_threshold:
+            host_limiter.record_success()
+            self.global_limiter.record_success()
+
+    def statistics(self) -> dict:
+        host_windows = [int(host_limiter.window) for host_limiter in self.host_limiters.values()]
+        return {
+            "concurrency_window": int(self.global_limiter.window),
+            "concurrency_decreases": self.global_limiter.decreases,
+            "min_host_concurrency_window": min(host_windows, default=0),
+            "max_host_concurrency_window": max(host_windows, default=0),
+            "throttled_hosts": sum(1 for host_limiter in self.host_limiters.values() if host_limiter.decreases),
+        }
@@ -1,19 +1,37 @@
-from copy import deepcopy
+from typing import Iterable, Iterator
 from .basic_filter import BasicFilter
+from ..link_batch import LinkBatch
+from ..url_normalization import domain_values, link_domain
 
 
 class DeduplicationFilter(BasicFilter):
-    def __init__(self, url_column_name: str):
+    streaming = True
+    row_local = True
+
+    def __init__(self, url_column_name: str, domain_column_name: str = None):
         super().__init__()
         self.__url_column_name = url_column_name
+        self.__domain_column_name = domain_column_name
+
+    def __is_first_seen(self, link_domain_name: str, checked_domains: set[str]) -> bool:
+        if link_domain_name in checked_domains:
+            return False
+        checked_domains.add(link_domain_name)
+        return True
+
+    def stream(self, link_objects: Iterable[dict]) -> Iterator[dict]:
+        checked_domains = set()
+        for link_object in link_objects:
+            link_domain_name = link_domain(link_object, self.__url_column_name, self.__domain_column_name)
+            if self.__is_first_seen(link_domain_name, checked_domains):
+                yield link_object
 
     def run(self, link_objects: list[dict]) -> list[dict]:
-        deduplicated_link_objects = []
-        checked_domains = []
-        updated_link_objects = deepcopy(link_objects)
-        for link_object in updated_link_objects:
-            link_domain_name = link_object[self.__url_column_name].split("/")[2]
-            if not checked_domains.__contains__(link_domain_name):
-                deduplicated_link_objects.append(link_object)
-                checked_domains.append(link_domain_name)
-        return super().run(deduplicated_link_objects)
+        if isinstance(link_objects, LinkBatch):
+            checked_domains = set()
+            return super().run(link_objects.take(
+                index for index, link_domain_name in enumerate(
+                    domain_values(link_objects, self.__url_column_name, self.__domain_column_name))
+                if self.__is_first_seen(link_domain_name, checked_domains)
+            ))
+        return super().run(list(self.stream(link_objects)))
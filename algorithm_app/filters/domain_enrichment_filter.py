@@ -0,0 +1,111 @@
+from collections import deque
+from typing import Iterable, Iterator
+from .basic_filter import BasicFilter, with_fields
+from .enrichment_store import DomainEnrichmentStore
+from .request_adapter import METADATA_ERROR_MESSAGE, NOT_FETCHED_MESSAGE
+from .translation_filter import TRANSLATION_FAILED_MESSAGE
+from ..url_normalization import link_domain
+
+import asyncio
+import logging
+
+# Results of transient failures are not stored, so the next query tries those domains again.
+TRANSIENT_FAILURE_VALUES = frozenset({NOT_FETCHED_MESSAGE, METADATA_ERROR_MESSAGE, TRANSLATION_FAILED_MESSAGE})
+
+
+class DomainEnrichmentFilter(BasicFilter):
+    """
+    Runs a chain of one link object in, one link object out filters only for the domains the enrichment store has
+    no fresh fields for. Fresh domains get their stored fields instead, newly computed fields are stored, and the
+    output keeps the input order.
+    """
+    streaming = True
+    asynchronous = True
+
+    def __init__(self, pipeline_filters: list[BasicFilter], enrichment_store: DomainEnrichmentStore | None,
+                 url_column_name: str, domain_column_name: str = None):
+        super().__init__()
+        self.pipeline_filters = pipeline_filters
+        self.enrichment_store = enrichment_store
+        self.__url_column_name = url_column_name
+        self.__domain_column_name = domain_column_name
+
+    def __enriched_fields(self, link_object: dict, enriched_link_object: dict) -> dict:
+        return {
+            field: value for field, value in enriched_link_object.items()
+            if field not in link_object or link_object[field] is not value
+        }
+
+    def __is_storable(self, fields: dict) -> bool:
+        return not any(isinstance(value, str) and value in TRANSIENT_FAILURE_VALUES for value in fields.values())
+
+    def __missing_link_objects(self, link_objects: Iterable[dict], pending: deque) -> Iterator[dict]:
+        """Records every link object in pending, paired with its stored fields, and yields those without any."""
+        for link_object in link_objects:
+            domain = link_domain(link_object, self.__url_column_name, self.__domain_column_name)
+            stored_fields = self.enrichment_store.get(domain)
+            pending.append((link_object, domain, stored_fields))
+            if stored_fields is None:
+                yield link_object
+
+    def __merge(self, enriched_link_objects: Iterable[dict], pending: deque) -> Iterator[dict]:
+        """Interleaves the chain's output with the stored fields in input order, storing the newly computed ones."""
+        for enriched_link_object in enriched_link_objects:
+            while pending[0][2] is not None:
+                link_object, _, stored_fields = pending.popleft()
+                yield with_fields(link_object, stored_fields)
+            link_object, domain, _ = pending.popleft()
+            fields = self.__enriched_fields(link_object, enriched_link_object)
+            if self.__is_storable(fields):
+                self.enrichment_store.put(domain, fields)
+            yield enriched_link_object
+        for link_object, _, stored_fields in pending:
+            yield with_fields(link_object, stored_fields)
+
+        logging.info(f"Domain enrichment store: {self.enrichment_store.hits} fresh domains reused, "
+                     f"{self.enrichment_store.misses} domains enriched")
+
+    def __release_results(self) -> None:
+        # The pipeline only releases the output of this filter, the chain's outputs are released here.
+        for pipeline_filter in self.pipeline_filters:
+            pipeline_filter.result_link_objects = None
+
+    async def __arun_chain(self, link_objects: list[dict]) -> list[dict]:
+        for pipeline_filter in self.pipeline_filters:
+            link_objects = await pipeline_filter.arun(link_objects)
+            pipeline_filter.result_link_objects = None
+        return link_objects
+
+    def stream(self, link_objects: Iterable[dict]) -> Iterator[dict]:
+        try:
+            if self.enrichment_store is None:
+                for pipeline_filter in self.pipeline_filters:
+                    link_objects = pipeline_filter.stream(link_objects)
+                yield from link_objects
+                return
+
+            # Every input link object in order, paired with its stored fields or None while it is in the chain.
+            pending = deque()
+            enriched_link_objects = self.__missing_link_objects(link_objects, pending)
+            for pipeline_filter in self.pipeline_filters:
+                enriched_link_objects = pipeline_filter.stream(enriched_link_objects)
+            yield from self.__merge(enriched_link_objects, pending)
+        finally:
+            self.__release_results()
+
+    def run(self, link_objects: list[dict]) -> list[dict]:
+        # Streaming would fetch and translate in small batches one after the other instead of all rows at once.
+        return asyncio.run(self.arun(link_objects))
+
+    async def arun(self, link_objects: list[dict]) -> list[dict]:
+        if self.enrichment_store is None:
+            return super().run(await self.__arun_chain(link_objects))
+
+        # Store lookups and writes are SQLite queries, which run off the event loop shared with the network filters.
+        pending = deque()
+        enriched_link_objects = await self.__arun_chain(
+            await asyncio.to_thread(list, self.__missing_link_objects(link_objects, pending)))
+        return super().run(await asyncio.to_thread(list, self.__merge(enriched_link_objects, pending)))
+
+    def __repr__(self) -> str:
+        return f"DomainEnrichmentFilter({' -> '.join(type(pipeline_filter).__name__ for pipeline_filter in self.pipeline_filters)})"
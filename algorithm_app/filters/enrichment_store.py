@@ -0,0 +1,62 @@
+import os
+import json
+import time
+import sqlite3
+
+
+class DomainEnrichmentStore:
+    """
+    SQLite table of the fields the network stages computed for a domain (page data, contacts and translations),
+    so domains seen by an earlier query can skip fetching, extraction and translation while they are fresh.
+    """
+
+    def __init__(self, database_path: str, ttl: float):
+        self.database_path = database_path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__connection = None
+
+    def __getstate__(self) -> dict:
+        # SQLite connections cannot be pickled, the copy in a worker process opens its own one.
+        state = dict(self.__dict__)
+        state['_DomainEnrichmentStore__connection'] = None
+        return state
+
+    def __db(self) -> sqlite3.Connection:
+        if self.__connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.database_path)), exist_ok=True)
+            connection = sqlite3.connect(self.database_path, timeout=30, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS domains (
+                    domain TEXT PRIMARY KEY,
+                    fields TEXT NOT NULL,
+                    enriched_at REAL NOT NULL
+                )''')
+            connection.commit()
+            self.__connection = connection
+        return self.__connection
+
+    def get(self, domain: str) -> dict | None:
+        """Returns the stored fields of the domain, or None when they are missing or older than the TTL."""
+        row = self.__db().execute('SELECT fields FROM domains WHERE domain = ? AND enriched_at > ?',
+                                  (domain, time.time() - self.ttl)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, domain: str, fields: dict) -> None:
+        self.__db().execute('INSERT OR REPLACE INTO domains (domain, fields, enriched_at) VALUES (?, ?, ?)',
+                            (domain, json.dumps(fields), time.time()))
+        self.__db().commit()
+
+    def statistics(self) -> dict:
+        return {"enrichment_store_hits": self.hits, "enrichment_store_misses": self.misses}
+
+    def close(self) -> None:
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
@@ -1,26 +1,36 @@
 import re
-from copy import deepcopy
-from .basic_filter import BasicFilter
+from typing import Iterable, Iterator
+from .basic_filter import BasicFilter, with_fields
+
+PHONE_PATTERN = re.compile(r'\+?\d[\d -]{8,12}\d')
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+
+def has_contact_information(text: str) -> bool:
+    return bool(PHONE_PATTERN.search(text) or EMAIL_PATTERN.search(text))
 
 
 class ExtractContactInformationFilter(BasicFilter):
+    streaming = True
+    row_local = True
 
     def __init__(self) -> None:
         super().__init__()
 
     def __find_phone_numbers_by_regex(self, text: str) -> list[str]:
-        phone_pattern = r'\+?\d[\d -]{8,12}\d'
-        found_phone_numbers = re.findall(phone_pattern, text)
+        found_phone_numbers = PHONE_PATTERN.findall(text)
         return found_phone_numbers
 
     def __find_emails_by_regex(self, text: str) -> list[str]:
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        found_website_emails = re.findall(email_pattern, text)
+        found_website_emails = EMAIL_PATTERN.findall(text)
         return found_website_emails
 
+    def stream(self, link_objects: Iterable[dict]) -> Iterator[dict]:
+        for link_object in link_objects:
+            yield with_fields(link_object, {
+                'phone_numbers': self.__find_phone_numbers_by_regex(link_object['text']),
+                'corporate_emails': self.__find_emails_by_regex(link_object['text'])
+            })
+
     def run(self, link_objects: list[dict]) -> list[dict]:
-        updated_link_objects = deepcopy(link_objects)
-        for link_object in updated_link_objects:
-            link_object['phone_numbers'] = self.__find_phone_numbers_by_regex(link_object['text'])
-            link_object['corporate_emails'] = self.__find_emails_by_regex(link_object['text'])
-        return super().run(updated_link_objects)
\ No newline at end of file
+        return super().run(list(self.stream(link_objects)))
\ No newline at end of file
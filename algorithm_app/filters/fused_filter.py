@@ -0,0 +1,31 @@
+from typing import Iterable, Iterator
+from .basic_filter import BasicFilter
+from ..link_batch import LinkBatch
+
+
+class FusedFilter(BasicFilter):
+    """Runs a chain of row local filters as a single pass, without materializing the results in between."""
+    streaming = True
+    row_local = True
+
+    def __init__(self, pipeline_filters: list[BasicFilter]):
+        super().__init__()
+        self.pipeline_filters = pipeline_filters
+
+    def stream(self, link_objects: Iterable[dict]) -> Iterator[dict]:
+        for pipeline_filter in self.pipeline_filters:
+            link_objects = pipeline_filter.stream(link_objects)
+        yield from link_objects
+
+    def run(self, link_objects: list[dict]) -> list[dict]:
+        if isinstance(link_objects, LinkBatch):
+            # Row local filters with a columnar run() are faster on a batch than one pass over its rows, and keep
+            # the output a LinkBatch for the filters downstream.
+            for pipeline_filter in self.pipeline_filters:
+                link_objects = pipeline_filter.run(link_objects)
+                pipeline_filter.result_link_objects = None
+            return super().run(link_objects)
+        return super().run(list(self.stream(link_objects)))
+
+    def __repr__(self) -> str:
+        return f"FusedFilter({' -> '.join(type(pipeline_filter).__name__ for pipeline_filter in self.pipeline_filters)})"
@@ -0,0 +1,106 @@
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
+from typing import Iterable, NamedTuple
+from urllib.parse import urldefrag, urljoin
+
+import re
+import atexit
+import threading
+import multiprocessing
+
+from bs4 import BeautifulSoup
+
+from ..url_normalization import parse_url
+
+PARSER_BACKENDS = ('auto', 'lxml', 'html.parser')
+TEXT_TAGS = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+TEXT_NOT_FOUND_MESSAGE = "Text cannot be extracted"
+
+_parser_pool: ProcessPoolExecutor | None = None
+_parser_pool_lock = threading.Lock()
+
+
+def resolve_parser_backend(backend: str) -> str:
+    """
+    Maps 'auto' to lxml when it is installed and to the pure Python html.parser otherwise. lxml repairs broken markup
+    differently, so titles, descriptions and texts are only guaranteed to match earlier runs with html.parser.
+    """
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend '{backend}', expected one of {PARSER_BACKENDS}")
+    if backend == 'auto':
+        return 'lxml' if find_spec('lxml') is not None else 'html.parser'
+    return backend
+
+
+def get_website_text(soup: BeautifulSoup) -> dict:
+    text = ' '.join([tag.text for tag in soup.find_all(TEXT_TAGS)])
+    stripped_text = re.sub(r'\s+', ' ', text).strip() if text else ''
+    return {
+        "text_found_status": True if stripped_text else False,
+        "text": stripped_text
+    }
+
+
+class ParsedWebsite(NamedTuple):
+    title: str | None
+    description: str | None
+    text: str
+    contact_links: list[str]
+
+
+def find_contact_links(soup: BeautifulSoup, base_url: str, link_keywords: Iterable[str]) -> list[str]:
+    """Returns absolute links to pages of the same site whose address or anchor text mentions one of the keywords."""
+    site_domain = parse_url(base_url).domain
+    contact_links = []
+    for anchor in soup.find_all('a', href=True):
+        href = anchor['href'].strip()
+        anchor_text = anchor.get_text(' ', strip=True).lower()
+        if not any(keyword in href.lower() or keyword in anchor_text for keyword in link_keywords):
+            continue
+        link = urldefrag(urljoin(base_url, href))[0]
+        parsed_link = parse_url(link)
+        if parsed_link.scheme in ('http', 'https') and parsed_link.domain == site_domain and link not in contact_links:
+            contact_links.append(link)
+    return contact_links
+
+
+def parse_website_data(html_response: str, parser_backend: str = 'html.parser', base_url: str = None,
+                       link_keywords: Iterable[str] = ()) -> ParsedWebsite:
+    """
+    Returns the title, meta description and text of a page, as plain strings so they can leave a worker process.
+    Given a base url and link keywords, also collects the links to the site's contact pages.
+    """
+    soup = BeautifulSoup(html_response, parser_backend)
+    website_text = get_website_text(soup)['text']
+    meta_description = soup.find('meta', attrs={'name': 'description'})
+    title = soup.title.string if soup.title else "Title cannot be extracted"
+    description = meta_description['content'] if meta_description else "Description cannot be extracted"
+    text = website_text if website_text else TEXT_NOT_FOUND_MESSAGE
+    contact_links = find_contact_links(soup, base_url, link_keywords) if base_url and link_keywords else []
+    return ParsedWebsite(str(title) if title is not None else None,
+                         str(description) if description is not None else None,
+                         text, contact_links)
+
+
+def get_parser_pool(max_workers: int = None) -> ProcessPoolExecutor:
+    """Returns the process pool shared by every RequestAdapter, starting it on first use."""
+    global _parser_pool
+    with _parser_pool_lock:
+        if _parser_pool is None:
+            # The pool is started lazily from pipeline worker threads, and forking a threaded process can copy locks
+            # held by other threads into the child, so workers come from a fork server started for the purpose.
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            context = multiprocessing.get_context(start_method)
+            if start_method == 'forkserver':
+                context.set_forkserver_preload([__name__])
+            _parser_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+            atexit.register(shutdown_parser_pool)
+        return _parser_pool
+
+
+def shutdown_parser_pool() -> None:
+    global _parser_pool
+    with _parser_pool_lock:
+        if _parser_pool is not None:
+            _parser_pool.shutdown(cancel_futures=True)
+            _parser_pool = None
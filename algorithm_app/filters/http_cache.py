@@ -0,0 +1,268 @@
+from typing import NamedTuple
+
+import os
+import json
+import time
+import zlib
+import asyncio
+import sqlite3
+import hashlib
+import threading
+
+from ..url_normalization import normalize_url
+
+# Index writes and access time updates are committed together once every so many of them.
+COMMIT_INTERVAL = 100
+# Least recently used entries read at once while evicting.
+EVICTION_BATCH_SIZE = 64
+
+
+class CachedResponse(NamedTuple):
+    url: str
+    status: int
+    headers: dict
+    body: str
+    stored_at: float
+
+    @property
+    def etag(self) -> str | None:
+        return self.headers.get('ETag')
+
+    @property
+    def last_modified(self) -> str | None:
+        return self.headers.get('Last-Modified')
+
+
+class HttpCache:
+    """
+    On-disk cache of fetched pages keyed by normalized url. Bodies are stored zlib compressed in files named after
+    the SHA-256 of their content, so identical pages served under several urls are kept once. A SQLite index holds
+    the headers, freshness and last access of every url and drives the least recently used eviction.
+
+    Bodies cut short while reading remember the read limits that cut them and are only served to readers with the
+    same limits. The size of the stored bodies is tracked as they are written, access times are written back and
+    committed in batches, and every method is safe to call from several threads, so callers on an event loop run
+    them with asyncio.to_thread through the a-prefixed variants.
+    """
+
+    def __init__(self, cache_dir: str, ttl: float, max_size_bytes: int):
+        self.cache_dir = cache_dir
+        self.bodies_dir = os.path.join(cache_dir, 'bodies')
+        self.ttl = ttl
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.__size = 0
+        self.__pending_accesses = {}
+        self.__uncommitted_writes = 0
+        self.__lock = threading.Lock()
+        self.__connection = None
+
+    def __getstate__(self) -> dict:
+        # SQLite connections and locks cannot be pickled, the copy in a worker process creates its own ones.
+        self.flush()
+        state = dict(self.__dict__)
+        state['_HttpCache__connection'] = None
+        state['_HttpCache__lock'] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __db(self) -> sqlite3.Connection:
+        if self.__connection is None:
+            os.makedirs(self.bodies_dir, exist_ok=True)
+            connection = sqlite3.connect(os.path.join(self.cache_dir, 'index.sqlite3'), timeout=30,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    url_key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    body_hash TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    read_limits TEXT NOT NULL DEFAULT ''
+                )''')
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(responses)')]
+            if 'read_limits' not in columns:
+                # Entries written before read limits were recorded may hold truncated bodies, so they are dropped.
+                connection.execute("ALTER TABLE responses ADD COLUMN read_limits TEXT NOT NULL DEFAULT ''")
+                connection.execute('DELETE FROM responses')
+            connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+            connection.execute('CREATE INDEX IF NOT EXISTS responses_body_hash ON responses (body_hash)')
+            connection.execute('CREATE TABLE IF NOT EXISTS bodies (body_hash TEXT PRIMARY KEY, size INTEGER NOT NULL)')
+            connection.commit()
+            self.__connection = connection
+            for (body_hash,) in connection.execute(
+                    'SELECT body_hash FROM bodies WHERE body_hash NOT IN (SELECT body_hash FROM responses)').fetchall():
+                self.__remove_body(body_hash)
+            connection.commit()
+            self.__size = connection.execute('SELECT COALESCE(SUM(size), 0) FROM bodies').fetchone()[0]
+        return self.__connection
+
+    def __body_path(self, body_hash: str) -> str:
+        return os.path.join(self.bodies_dir, body_hash[:2], f'{body_hash}.zz')
+
+    def __url_key(self, url: str) -> str:
+        return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+    def __write(self) -> None:
+        """Commits once every so many writes, a crash loses at most the last few entries of the index."""
+        self.__uncommitted_writes += 1
+        if self.__uncommitted_writes >= COMMIT_INTERVAL:
+            self.__flush()
+
+    def __flush(self) -> None:
+        if self.__pending_accesses:
+            self.__db().executemany('UPDATE responses SET accessed_at = ? WHERE url_key = ?',
+                                    [(accessed_at, url_key) for url_key, accessed_at in self.__pending_accesses.items()])
+            self.__pending_accesses.clear()
+        if self.__connection is not None:
+            self.__connection.commit()
+        self.__uncommitted_writes = 0
+
+    def flush(self) -> None:
+        """Writes back pending access times and commits pending entries."""
+        with self.__lock:
+            self.__flush()
+
+    def is_fresh(self, cached_response: CachedResponse) -> bool:
+        return time.time() - cached_response.stored_at < self.ttl
+
+    def get(self, url: str, read_limits: str = '') -> CachedResponse | None:
+        """
+        Returns the stored response for the url, fresh or not, and marks it as recently used. Bodies that were cut
+        short are only returned when they were cut by the same read limits.
+        """
+        url_key = self.__url_key(url)
+        with self.__lock:
+            row = self.__db().execute(
+                'SELECT url, status, headers, body_hash, stored_at, read_limits FROM responses WHERE url_key = ?',
+                (url_key,)).fetchone()
+            if row is None:
+                return None
+            stored_url, status, headers, body_hash, stored_at, stored_read_limits = row
+            if stored_read_limits and stored_read_limits != read_limits:
+                return None
+            try:
+                with open(self.__body_path(body_hash), 'rb') as body_file:
+                    body = zlib.decompress(body_file.read()).decode('utf-8')
+            except (OSError, zlib.error):
+                # The body was removed or damaged outside of the cache, so the entry is useless.
+                self.__db().execute('DELETE FROM responses WHERE url_key = ?', (url_key,))
+                self.__write()
+                return None
+            self.__pending_accesses[url_key] = time.time()
+            if len(self.__pending_accesses) >= COMMIT_INTERVAL:
+                self.__flush()
+            return CachedResponse(stored_url, status, json.loads(headers), body, stored_at)
+
+    def put(self, url: str, status: int, headers: dict, body: str, read_limits: str = '') -> None:
+        """Stores a response; read_limits describe the limits that cut the body short, empty for complete bodies."""
+        encoded_body = body.encode('utf-8')
+        body_hash = hashlib.sha256(encoded_body).hexdigest()
+        body_path = self.__body_path(body_hash)
+        url_key = self.__url_key(url)
+        compressed_body = None if os.path.exists(body_path) else zlib.compress(encoded_body)
+        with self.__lock:
+            if compressed_body is not None and not os.path.exists(body_path):
+                os.makedirs(os.path.dirname(body_path), exist_ok=True)
+                temporary_path = f'{body_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(temporary_path, 'wb') as body_file:
+                    body_file.write(compressed_body)
+                os.replace(temporary_path, body_path)
+                self.__db().execute('INSERT OR REPLACE INTO bodies (body_hash, size) VALUES (?, ?)',
+                                    (body_hash, len(compressed_body)))
+                self.__size += len(compressed_body)
+            previous_row = self.__db().execute('SELECT body_hash FROM responses WHERE url_key = ?',
+                                               (url_key,)).fetchone()
+            now = time.time()
+            self.__db().execute(
+                'INSERT OR REPLACE INTO responses '
+                '(url_key, url, status, headers, body_hash, stored_at, accessed_at, read_limits) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url_key, url, status, json.dumps(headers), body_hash, now, now, read_limits))
+            self.__pending_accesses.pop(url_key, None)
+            if previous_row is not None and previous_row[0] != body_hash:
+                self.__remove_body_if_unreferenced(previous_row[0])
+            if self.__size > self.max_size_bytes:
+                self.__evict()
+            self.__write()
+
+    def refresh(self, url: str) -> None:
+        """Restarts the freshness period of an entry after the server confirmed it with a 304 response."""
+        url_key = self.__url_key(url)
+        now = time.time()
+        with self.__lock:
+            self.__db().execute('UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url_key = ?',
+                                (now, now, url_key))
+            self.__pending_accesses.pop(url_key, None)
+            self.__write()
+            self.revalidations += 1
+
+    async def aget(self, url: str, read_limits: str = '') -> CachedResponse | None:
+        return await asyncio.to_thread(self.get, url, read_limits)
+
+    async def aput(self, url: str, status: int, headers: dict, body: str, read_limits: str = '') -> None:
+        await asyncio.to_thread(self.put, url, status, headers, body, read_limits)
+
+    async def arefresh(self, url: str) -> None:
+        await asyncio.to_thread(self.refresh, url)
+
+    def size(self) -> int:
+        with self.__lock:
+            self.__db()
+            return self.__size
+
+    def __remove_body(self, body_hash: str) -> None:
+        row = self.__db().execute('SELECT size FROM bodies WHERE body_hash = ?', (body_hash,)).fetchone()
+        try:
+            os.remove(self.__body_path(body_hash))
+        except FileNotFoundError:
+            pass
+        self.__db().execute('DELETE FROM bodies WHERE body_hash = ?', (body_hash,))
+        if row is not None:
+            self.__size -= row[0]
+
+    def __remove_body_if_unreferenced(self, body_hash: str) -> None:
+        if self.__db().execute('SELECT 1 FROM responses WHERE body_hash = ? LIMIT 1', (body_hash,)).fetchone() is None:
+            self.__remove_body(body_hash)
+
+    def __evict(self) -> None:
+        """Drops least recently used entries until the stored bodies fit into the size limit again."""
+        self.__flush()
+        while self.__size > self.max_size_bytes:
+            rows = self.__db().execute(
+                'SELECT url_key, body_hash FROM responses ORDER BY accessed_at LIMIT ?', (EVICTION_BATCH_SIZE,)).fetchall()
+            if not rows:
+                break
+            for url_key, body_hash in rows:
+                self.__db().execute('DELETE FROM responses WHERE url_key = ?', (url_key,))
+                self.__remove_body_if_unreferenced(body_hash)
+                self.evictions += 1
+                if self.__size <= self.max_size_bytes:
+                    break
+        self.__db().commit()
+
+    def statistics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "http_cache_hits": self.hits,
+            "http_cache_misses": self.misses,
+            "http_cache_revalidations": self.revalidations,
+            "http_cache_evictions": self.evictions,
+            "http_cache_hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__connection is not None:
+                self.__flush()
+                self.__connection.close()
+                self.__connection = None
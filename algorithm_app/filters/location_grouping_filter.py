@@ -1,24 +1,74 @@
-from copy import deepcopy
-from .basic_filter import BasicFilter
+from .basic_filter import BasicFilter, with_fields
+from ..link_batch import LinkBatch, column_values
+from ..url_normalization import domain_values
 
 
 class LocationGroupingFilter(BasicFilter):
-    def __init__(self, url_column_name: str, location_column_name: str):
+    def __init__(self, url_column_name: str, location_column_name: str, domain_column_name: str = None):
         super().__init__()
         self.__url_column_name = url_column_name
         self.__location_column_name = location_column_name
+        self.__domain_column_name = domain_column_name
+
+    def __index_domain_locations(self, links: list[str], locations: list[str], link_domain_names: list[str]) -> dict:
+        """
+        Builds a domain -> location -> [first index, first url, index of the first other url] index in one pass.
+        A location is grouped onto a link only when it was seen on a different url of the same domain, so the
+        first occurrence with a url other than the first one is kept as well.
+        """
+        domain_locations = {}
+        for index, (link_url, link_location, link_domain_name) in enumerate(zip(links, locations, link_domain_names)):
+            location_occurrences = domain_locations.get(link_domain_name)
+            if location_occurrences is None:
+                location_occurrences = domain_locations[link_domain_name] = {}
+            occurrence = location_occurrences.get(link_location)
+            if occurrence is None:
+                location_occurrences[link_location] = [index, link_url, None]
+            elif occurrence[2] is None and link_url != occurrence[1]:
+                occurrence[2] = index
+        return domain_locations
+
+    def __group_link_locations(self, link_url: str, link_location: str, location_occurrences: dict) -> list[str]:
+        other_locations = []
+        for location, (first_index, first_url, other_url_index) in location_occurrences.items():
+            if location == link_location:
+                continue
+            grouping_index = first_index if first_url != link_url else other_url_index
+            if grouping_index is not None:
+                other_locations.append((grouping_index, location))
+        # Indexes are unique, so sorting the tuples never falls back to comparing locations.
+        other_locations.sort()
+        return [link_location] + [location for _, location in other_locations]
+
+    def __group_locations(self, links: list[str], locations: list[str], link_domain_names: list[str]) -> list[list[str]]:
+        domain_locations = self.__index_domain_locations(links, locations, link_domain_names)
+        domain_first_urls = {
+            link_domain_name: {first_url for _, first_url, _ in location_occurrences.values()}
+            for link_domain_name, location_occurrences in domain_locations.items() if len(location_occurrences) > 1
+        }
+        grouped_locations = []
+        for link_url, link_location, link_domain_name in zip(links, locations, link_domain_names):
+            first_urls = domain_first_urls.get(link_domain_name)
+            if first_urls is None:
+                grouped_locations.append([link_location])
+            elif link_url in first_urls:
+                grouped_locations.append(self.__group_link_locations(link_url, link_location, domain_locations[link_domain_name]))
+            else:
+                # Every location of the domain was first seen on another url, so they group in first seen order.
+                grouped_locations.append([link_location] + [
+                    location for location in domain_locations[link_domain_name] if location != link_location
+                ])
+        return grouped_locations
 
     def run(self, link_objects: list[dict]) -> list[dict]:
-        filtered_objects = deepcopy(link_objects)
-        for index, link_object in enumerate(filtered_objects):
-            link_url = link_object[self.__url_column_name]
-            link_domain_name = link_url.split("/")[2]
-            filtered_objects[index][self.__location_column_name] = [link_object[self.__location_column_name]]
-            for self_link_object in link_objects:
-                self_link_url = self_link_object[self.__url_column_name]
-                self_link_domain_name = self_link_url.split("/")[2]
-                if link_domain_name == self_link_domain_name \
-                        and link_url != self_link_url\
-                        and not link_object[self.__location_column_name].__contains__(self_link_object[self.__location_column_name]):
-                    link_object[self.__location_column_name].append(self_link_object[self.__location_column_name])
-        return super().run(filtered_objects)
\ No newline at end of file
+        grouped_locations = self.__group_locations(
+            column_values(link_objects, self.__url_column_name),
+            column_values(link_objects, self.__location_column_name),
+            domain_values(link_objects, self.__url_column_name, self.__domain_column_name)
+        )
+        if isinstance(link_objects, LinkBatch):
+            return super().run(link_objects.with_column(self.__location_column_name, grouped_locations))
+        return super().run([
+            with_fields(link_object, {self.__location_column_name: link_locations})
+            for link_object, link_locations in zip(link_objects, grouped_locations)
+        ])
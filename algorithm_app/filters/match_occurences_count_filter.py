@@ -1,28 +1,34 @@
-from copy import deepcopy
+from typing import Iterable, Iterator
 from .basic_filter import BasicFilter
+from ..aggregation import index_by
+from ..url_normalization import link_domain
 
 
 class MatchOccurrencesCountFilter(BasicFilter):
+    streaming = True
 
-    def __init__(self, url_column_name: str, num_occurrences_column_name: str, location_column_name: str):
+    def __init__(self, url_column_name: str, num_occurrences_column_name: str, location_column_name: str,
+                 domain_column_name: str = None):
         super().__init__()
         self.__url_column_name = url_column_name
         self.__num_occurrences_column_name = num_occurrences_column_name
         self.__location_column_name = location_column_name
+        self.__domain_column_name = domain_column_name
+
+    def stream(self, link_objects: Iterable[dict], domain_occurrences_objects: list[dict]) -> Iterator[dict]:
+        domain_occurrences_index = index_by(domain_occurrences_objects, 'domain')
+        for link_object in link_objects:
+            link_domain_name = link_domain(link_object, self.__url_column_name, self.__domain_column_name)
+            domain_occurrences_object = domain_occurrences_index.get(link_domain_name)
+            if domain_occurrences_object is not None:
+                matched_link_object = {
+                    self.__location_column_name: link_object[self.__location_column_name],
+                    self.__url_column_name: link_object[self.__url_column_name],
+                    self.__num_occurrences_column_name: domain_occurrences_object[self.__num_occurrences_column_name]
+                }
+                if self.__domain_column_name:
+                    matched_link_object[self.__domain_column_name] = link_domain_name
+                yield matched_link_object
 
     def run(self, link_objects: list[dict], domain_occurrences_objects: list[dict]) -> list[dict]:
-        filtered_link_objects = []
-        updated_link_objects = deepcopy(link_objects)
-        for link_object in updated_link_objects:
-            link_domain_name = link_object[self.__url_column_name].split("/")[2]
-            for domain_occurrences_object in domain_occurrences_objects:
-                if domain_occurrences_object['domain'] == link_domain_name:
-                    filtered_link_objects.append(
-                        {
-                            self.__location_column_name: link_object[self.__location_column_name],
-                            self.__url_column_name: link_object[self.__url_column_name],
-                            self.__num_occurrences_column_name: domain_occurrences_object[self.__num_occurrences_column_name]
-                        }
-                    )
-                    break
-        return super().run(filtered_link_objects)
\ No newline at end of file
+        return super().run(list(self.stream(link_objects, domain_occurrences_objects)))
\ No newline at end of file
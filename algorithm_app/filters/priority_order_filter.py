@@ -0,0 +1,17 @@
+from .basic_filter import BasicFilter
+from ..link_batch import LinkBatch, column_values
+
+
+class PriorityOrderFilter(BasicFilter):
+    """Orders link objects by descending number of occurrences, keeping the input order among equal counts."""
+
+    def __init__(self, num_occurrences_column_name: str):
+        super().__init__()
+        self.__num_occurrences_column_name = num_occurrences_column_name
+
+    def run(self, link_objects: list[dict]) -> list[dict]:
+        num_occurrences = column_values(link_objects, self.__num_occurrences_column_name)
+        order = sorted(range(len(num_occurrences)), key=num_occurrences.__getitem__, reverse=True)
+        if isinstance(link_objects, LinkBatch):
+            return super().run(link_objects.take(order))
+        return super().run([link_objects[index] for index in order])
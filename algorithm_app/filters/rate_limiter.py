@@ -0,0 +1,99 @@
+from collections import deque
+
+import time
+import asyncio
+import threading
+
+_rate_limiters: dict = {}
+_rate_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Starts at most rate requests per second, in bursts of up to capacity requests. Throttled responses decrease the
+    rate multiplicatively and pause every caller with exponential backoff, healthy responses grow it back by about
+    one request per second per rate's worth of responses. Thread safe and independent of any event loop, so one
+    bucket paces the jobs of every thread in the process. Without a configured rate requests start freely until the
+    first throttled response, from then on the rate they were starting at, decreased, is paced and grown back.
+    """
+
+    def __init__(self, rate: float | None, capacity: int, min_rate: float = 0.1, decrease_factor: float = 0.5,
+                 backoff: float = 1.0, max_backoff: float = 60.0):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.capacity = capacity
+        self.decrease_factor = decrease_factor
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.tokens = float(capacity)
+        self.requests = 0
+        self.throttle_events = 0
+        self.__updated = time.monotonic()
+        self.__paused_until = 0.0
+        self.__consecutive_throttles = 0
+        # Start times of the requests of the last second, to learn a rate from when none is configured.
+        self.__recent_starts = deque()
+        self.__lock = threading.Lock()
+
+    def __try_acquire(self) -> float:
+        """Takes a token if the bucket holds one and returns 0, otherwise the seconds until it may hold one."""
+        with self.__lock:
+            now = time.monotonic()
+            if now < self.__paused_until:
+                return self.__paused_until - now
+            if self.rate is None:
+                self.__recent_starts.append(now)
+                while self.__recent_starts[0] < now - 1:
+                    self.__recent_starts.popleft()
+            else:
+                self.tokens = min(self.capacity, self.tokens + (now - self.__updated) * self.rate)
+                self.__updated = now
+                if self.tokens < 1:
+                    return (1 - self.tokens) / self.rate
+                self.tokens -= 1
+            self.requests += 1
+            return 0.0
+
+    async def acquire(self) -> None:
+        # Waiting callers check again after every sleep, so they follow rate changes and pauses made meanwhile.
+        while (delay := self.__try_acquire()) > 0:
+            await asyncio.sleep(delay)
+
+    def record_success(self) -> None:
+        with self.__lock:
+            self.__consecutive_throttles = 0
+            if self.rate is not None:
+                self.rate = self.rate + 1 / self.rate
+                if self.max_rate is not None:
+                    self.rate = min(self.max_rate, self.rate)
+
+    def record_throttle(self) -> None:
+        with self.__lock:
+            now = time.monotonic()
+            self.throttle_events += 1
+            # Requests already in flight when the service started throttling belong to the same episode.
+            if now < self.__paused_until:
+                return
+            self.__consecutive_throttles += 1
+            self.__paused_until = now + min(self.max_backoff, self.backoff * 2 ** (self.__consecutive_throttles - 1))
+            if self.rate is None:
+                self.rate = float(max(1, len(self.__recent_starts)))
+                self.__updated = now
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self.tokens = 0.0
+
+    def statistics(self) -> dict:
+        return {
+            "rate_limited_requests": self.requests,
+            "rate_limit_throttle_events": self.throttle_events,
+            "rate_limit_requests_per_second": round(self.rate, 2) if self.rate is not None else None,
+        }
+
+
+def get_rate_limiter(name: str, rate: float | None, capacity: int, **kwargs) -> TokenBucket:
+    """Returns the token bucket shared by every job in the process calling the named service, creating it on first use."""
+    with _rate_limiters_lock:
+        if name not in _rate_limiters:
+            _rate_limiters[name] = TokenBucket(rate, capacity, **kwargs)
+        return _rate_limiters[name]
@@ -1,18 +1,36 @@
-from copy import deepcopy
-from .basic_filter import BasicFilter
+from typing import Iterable, Iterator
+from .basic_filter import BasicFilter, with_fields
+from ..link_batch import LinkBatch
+from ..url_normalization import parse_url, strip_host_prefix
 
 
 class RegularizeLinksFilter(BasicFilter):
+    streaming = True
+    row_local = True
 
-    def __init__(self, url_column_name: str, replace_string: str):
+    def __init__(self, url_column_name: str, replace_string: str, domain_column_name: str = None):
         super().__init__()
         self.__url_column_name = url_column_name
         self.__replace_string = replace_string
+        self.__domain_column_name = domain_column_name
+
+    def __regularize_link(self, link: str) -> str:
+        return strip_host_prefix(link, self.__replace_string)
+
+    def stream(self, link_objects: Iterable[dict]) -> Iterator[dict]:
+        for link_object in link_objects:
+            link = self.__regularize_link(link_object[self.__url_column_name])
+            regularized_fields = {self.__url_column_name: link}
+            if self.__domain_column_name:
+                regularized_fields[self.__domain_column_name] = parse_url(link).domain
+            yield with_fields(link_object, regularized_fields)
 
     def run(self, link_objects: list[dict]) -> list[dict]:
-        filtered_link_objects = []
-        updated_link_objects = deepcopy(link_objects)
-        for link_object in updated_link_objects:
-            link_object[self.__url_column_name ] = link_object[self.__url_column_name ].replace(self.__replace_string, '')
-            filtered_link_objects.append(link_object)
-        return super().run(filtered_link_objects)
\ No newline at end of file
+        if isinstance(link_objects, LinkBatch):
+            links = [self.__regularize_link(link) for link in link_objects.column(self.__url_column_name)]
+            regularized_link_objects = link_objects.with_column(self.__url_column_name, links)
+            if self.__domain_column_name:
+                regularized_link_objects = regularized_link_objects.with_column(
+                    self.__domain_column_name, [parse_url(link).domain for link in links])
+            return super().run(regularized_link_objects)
+        return super().run(list(self.stream(link_objects)))
@@ -6,9 +6,19 @@ import re
 import os
 import yaml
 import logging
+import random
+import time
 
-from bs4 import BeautifulSoup
-from copy import deepcopy
+from collections import deque
+
+from multidict import CIMultiDict
+from .circuit_breaker import HostCircuitBreakers
+from .concurrency_controller import AimdConcurrencyController
+from .extract_contact_information_filter import has_contact_information
+from .html_parser import (ParsedWebsite, TEXT_NOT_FOUND_MESSAGE, get_parser_pool, parse_website_data,
+                          resolve_parser_backend)
+from .http_cache import CachedResponse, HttpCache
+from ..url_normalization import normalize_url, parse_url
 
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_FILE_PATH = os.path.join(APP_DIR, '..', 'config.yaml')
@@ -17,78 +27,415 @@ with open(CONFIG_FILE_PATH, 'r') as file:
     config: dict = yaml.safe_load(file)
 
 HEADERS = config['search']['headers']
+MAX_CONCURRENCY: int = config['request_adapter']['max_concurrency']
+MAX_CONCURRENCY_PER_HOST: int = config['request_adapter']['max_concurrency_per_host']
+DNS_CACHE_TTL: int = config['request_adapter']['dns_cache_ttl']
+KEEPALIVE_TIMEOUT: int = config['request_adapter']['keepalive_timeout']
+ADAPTIVE_CONCURRENCY: dict = config['request_adapter']['adaptive_concurrency']
+TIMEOUTS: dict = config['request_adapter']['timeouts']
+RETRIES: dict = config['request_adapter']['retries']
+CIRCUIT_BREAKER: dict = config['request_adapter']['circuit_breaker']
+STAGE_DEADLINE: float | None = config['request_adapter']['stage_deadline']
+STREAMING_FETCH: dict = config['request_adapter']['streaming_fetch']
+HTML_PARSER: dict = config['request_adapter']['html_parser']
+PARSER_BACKEND: str = resolve_parser_backend(HTML_PARSER['backend'])
+HTTP_CACHE: dict = config['request_adapter']['http_cache']
+HTTP_CACHE_DIR = os.path.join(config['directories']['cache_dir'], 'http')
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+SITE_CRAWL: dict = config['request_adapter']['site_crawl']
+
+# sock_read bounds the wait for the first byte of the response as well as any later stall while reading it.
+CLIENT_TIMEOUT = aiohttp.ClientTimeout(total=TIMEOUTS['total'], sock_connect=TIMEOUTS['connect'],
+                                       sock_read=TIMEOUTS['first_byte'])
+NOT_FETCHED_MESSAGE = "Website was not fetched"
+METADATA_ERROR_MESSAGE = "Metadata cannot be extracted"
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+HEAD_END_PATTERN = re.compile(rb'</head\s*>|<body[\s>]', re.IGNORECASE)
+
+try:
+    # aiohttp only decodes brotli responses when one of the brotli packages is installed.
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
 
 ssl._create_default_https_context = ssl._create_unverified_context
 ssl._create_default_https_context = ssl.create_default_context(cafile=certifi.where())
 
+# Loading the CA bundle is expensive, so every connection shares one context.
+SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where())
+
+
+def create_concurrency_controller() -> AimdConcurrencyController:
+    return AimdConcurrencyController(
+        initial_concurrency=ADAPTIVE_CONCURRENCY['initial_concurrency'],
+        min_concurrency=ADAPTIVE_CONCURRENCY['min_concurrency'],
+        max_concurrency=MAX_CONCURRENCY,
+        initial_concurrency_per_host=ADAPTIVE_CONCURRENCY['initial_concurrency_per_host'],
+        min_concurrency_per_host=ADAPTIVE_CONCURRENCY['min_concurrency_per_host'],
+        max_concurrency_per_host=MAX_CONCURRENCY_PER_HOST,
+        adaptive=ADAPTIVE_CONCURRENCY['enabled'],
+        decrease_factor=ADAPTIVE_CONCURRENCY['decrease_factor'],
+        latency_threshold=ADAPTIVE_CONCURRENCY['latency_threshold'],
+        congestion_cooldown=ADAPTIVE_CONCURRENCY['congestion_cooldown']
+    )
+
+
+def create_circuit_breakers() -> HostCircuitBreakers:
+    return HostCircuitBreakers(CIRCUIT_BREAKER['failure_threshold'], CIRCUIT_BREAKER['reset_timeout'])
+
+
+def create_http_cache() -> HttpCache | None:
+    if not HTTP_CACHE['enabled']:
+        return None
+    return HttpCache(HTTP_CACHE_DIR, HTTP_CACHE['ttl'], HTTP_CACHE['max_size_mb'] * 1024 * 1024)
+
+
+def create_client_session() -> aiohttp.ClientSession:
+    """Has to be called on the event loop the session is used on, which owns its pooled connections."""
+    headers = CIMultiDict(HEADERS)
+    headers['Accept-Encoding'] = ACCEPT_ENCODING
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONCURRENCY,
+        limit_per_host=MAX_CONCURRENCY_PER_HOST,
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        ssl=SSL_CONTEXT
+    )
+    return aiohttp.ClientSession(headers=headers, connector=connector)
+
 
 class RequestAdapter:
 
-    def __init__(self, links):
+    def __init__(self, links, concurrency_controller: AimdConcurrencyController = None,
+                 circuit_breakers: HostCircuitBreakers = None, deadline: float = None, http_cache: HttpCache = None,
+                 session: aiohttp.ClientSession = None):
+        """
+        The deadline is a time.monotonic() timestamp after which unfinished urls are reported as not fetched. A
+        session shares its connection pool with other adapters on the same event loop and is left open.
+        """
         self.links = links
+        self.concurrency_controller = concurrency_controller or create_concurrency_controller()
+        self.circuit_breakers = circuit_breakers or create_circuit_breakers()
+        self.http_cache = http_cache if http_cache is not None else create_http_cache()
+        self.deadline = deadline
+        self.session = session
         self.client_errors = 0
         self.timeout_errors = 0
         self.other_errors = 0
+        self.retries = 0
+        self.not_fetched = 0
+        self.non_html_responses = 0
+        self.truncated_responses = 0
+        self.bytes_read = 0
+        self.crawled_sites = 0
+        self.contact_pages_fetched = 0
+        # Landing page results of sites whose contact pages are still being crawled, used if the deadline hits.
+        self.__landing_results = {}
+        self.statistics = {}
+
+    async def __parse_website_data(self, html_response: str, base_url: str = None) -> ParsedWebsite:
+        """Parses a page, collecting its contact links too when a base url is given and the site crawl is enabled."""
+        link_keywords = SITE_CRAWL['link_keywords'] if base_url and SITE_CRAWL['enabled'] else ()
+        # Parsing is CPU bound, so in a worker process it no longer stalls the other requests on the event loop.
+        if not HTML_PARSER['process_pool']:
+            return parse_website_data(html_response, PARSER_BACKEND, base_url, link_keywords)
+        return await asyncio.get_running_loop().run_in_executor(
+            get_parser_pool(HTML_PARSER['max_workers']), parse_website_data, html_response, PARSER_BACKEND,
+            base_url, link_keywords)
 
-    def __get_website_text(self, soup: BeautifulSoup) -> dict:
-        text = ' '.join([tag.text for tag in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])])
-        stripped_text = re.sub(r'\s+', ' ', text).strip() if text else ''
+    def __website_data(self, url: str, title: str, description: str, text: str) -> dict:
         return {
-            "text_found_status": True if stripped_text else False,
-            "text": stripped_text
+            "url": url if url else "URL is missing",
+            "title": title if title else "Title is missing",
+            "description": description if description else "Description is missing",
+            "text": text if text else "Text is missing"
         }
 
-    async def __fetch_website_data(self, session: aiohttp.ClientSession, url: str) -> dict:
-        title = ""
-        description = ""
-        text = ""
+    def __not_fetched_website_data(self, url: str) -> dict:
+        self.not_fetched += 1
+        return self.__website_data(url, NOT_FETCHED_MESSAGE, NOT_FETCHED_MESSAGE, "Text cannot be extracted")
+
+    def __backoff_delay(self, attempt: int) -> float:
+        # Full jitter keeps retries of many failing urls from hitting the hosts in lockstep.
+        return random.uniform(0, min(RETRIES['backoff_max'], RETRIES['backoff_base'] * 2 ** attempt))
+
+    def __read_limits(self) -> str:
+        """Describes the limits that cut bodies short, so cached bodies are only reused by runs reading the same way."""
+        return f"max_bytes={STREAMING_FETCH['max_bytes']};head_only={STREAMING_FETCH['head_only']}"
+
+    async def __read_html(self, response: aiohttp.ClientResponse) -> tuple[str, bool]:
+        """
+        Reads the body in chunks, stopping at the configured byte cap or, in head only mode, once the head has been
+        read, and returns it together with whether it was cut short. Responses that declare a non HTML content type
+        are not read at all.
+        """
+        if 'Content-Type' in response.headers and response.content_type not in HTML_CONTENT_TYPES:
+            self.non_html_responses += 1
+            return '', False
+
+        body = bytearray()
+        truncated = False
+        async for chunk in response.content.iter_chunked(STREAMING_FETCH['chunk_size']):
+            body += chunk
+            if len(body) >= STREAMING_FETCH['max_bytes']:
+                del body[STREAMING_FETCH['max_bytes']:]
+                self.truncated_responses += 1
+                truncated = True
+                break
+            head_end = HEAD_END_PATTERN.search(body) if STREAMING_FETCH['head_only'] else None
+            if head_end:
+                del body[head_end.start():]
+                truncated = True
+                break
+        self.bytes_read += len(body)
+        # Truncation may cut a multi-byte character in half, hence the lenient decoding.
+        return body.decode(response.charset or 'utf-8', errors='replace'), truncated
+
+    async def __cached_response(self, url: str) -> CachedResponse | None:
+        # The cache reads files and SQLite, which would stall every other request if done on the event loop.
+        if self.http_cache is None:
+            return None
+        return await self.http_cache.aget(url, self.__read_limits() if STREAMING_FETCH['enabled'] else '')
+
+    async def __fetch_page(self, session: aiohttp.ClientSession, url: str) -> str | None:
+        """Single attempt fetch of an additional page of a site, served from the cache when it is fresh there."""
+        cached_response = await self.__cached_response(url)
+        if cached_response is not None and self.http_cache.is_fresh(cached_response):
+            return cached_response.body
+        host = parse_url(url).host
+        if not self.circuit_breakers.allow_request(host):
+            return None
         try:
-            ssl_context = ssl.create_default_context(cafile=certifi.where())
-            async with session.get(url, ssl=ssl_context, timeout=300) as response:
-                html_response = await response.text()
-                soup = BeautifulSoup(html_response, 'html.parser')
-                website_text = self.__get_website_text(soup)['text']
-                meta_description = soup.find('meta', attrs={'name': 'description'})
-                title = soup.title.string if soup.title else "Title cannot be extracted"
-                description = meta_description['content'] if meta_description else "Description cannot be extracted"
-                text = website_text if website_text else "Text cannot be extracted"
-        except aiohttp.ClientError as e:
-            logging.info(f"Error fetching metadata for {url}: {e}")
-            title = "Metadata cannot be extracted"
-            description = "Metadata cannot be extracted"
-            text = "Text cannot be extracted"
-            self.client_errors += 1
-        except (TimeoutError, aiohttp.ClientTimeout) as e:
-            logging.info(f"Timeout error fetching metadata for {url}: {e}")
-            title = "Metadata cannot be extracted"
-            description = "Metadata cannot be extracted"
-            text = "Text cannot be extracted"
-            self.timeout_errors += 1
+            html_response, congested = await self.__request_website(session, url, host, cached_response)
+        except (TimeoutError, aiohttp.ClientError) as e:
+            logging.info(f"Error fetching contact page {url}: {e}")
+            self.circuit_breakers.record(host, success=isinstance(e, aiohttp.ClientResponseError))
+            return None
         except Exception as e:
-            logging.info(f"Unexpected error fetching metadata for {url}: {e}")
-            title = "Metadata cannot be extracted"
-            description = "Metadata cannot be extracted"
-            text = "Text cannot be extracted"
+            # A broken contact page must not cost the site its landing page result.
+            logging.info(f"Unexpected error fetching contact page {url}: {e}")
             self.other_errors += 1
-        finally:
-            return {
-                "url": url if url else "URL is missing",
-                "title": title if title else "Title is missing",
-                "description": description if description else "Description is missing",
-                "text": text if text else "Text is missing"
-            }
-
-    async def __extract_website_data_async(self) -> tuple:
-        async with aiohttp.ClientSession(headers=HEADERS) as session:
-            tasks = [self.__fetch_website_data(session, link) for link in self.links]
-            results = await asyncio.gather(*tasks)
-        return results
+            return None
+        self.circuit_breakers.record(host, success=not congested)
+        return None if congested else html_response
+
+    async def __crawl_contact_pages(self, session: aiohttp.ClientSession, url: str, contact_links: list[str]) -> list[str]:
+        """
+        Second fetch wave over the contact and about pages of a site, breadth first up to the configured depth and
+        page budget, stopping as soon as a page shows contact information.
+        """
+        self.crawled_sites += 1
+        visited = {normalize_url(url)}
+        queue = deque((contact_link, 1) for contact_link in contact_links)
+        texts = []
+        pages_fetched = 0
+        while queue and pages_fetched < SITE_CRAWL['max_pages_per_site']:
+            contact_link, depth = queue.popleft()
+            if normalize_url(contact_link) in visited:
+                continue
+            visited.add(normalize_url(contact_link))
+            pages_fetched += 1
+            html_response = await self.__fetch_page(session, contact_link)
+            if not html_response:
+                continue
+            self.contact_pages_fetched += 1
+            try:
+                contact_page = await self.__parse_website_data(
+                    html_response, contact_link if depth < SITE_CRAWL['max_depth'] else None)
+            except Exception as e:
+                logging.info(f"Unexpected error parsing contact page {contact_link}: {e}")
+                continue
+            if contact_page.text != TEXT_NOT_FOUND_MESSAGE:
+                texts.append(contact_page.text)
+                if has_contact_information(contact_page.text):
+                    break
+            queue.extend((next_link, depth + 1) for next_link in contact_page.contact_links)
+        return texts
+
+    async def __landing_website_data(self, session: aiohttp.ClientSession, url: str, html_response: str) -> dict:
+        """Extracts the landing page and, when it shows no contact information, adds the text of its contact pages."""
+        landing_page = await self.__parse_website_data(html_response, url)
+        website_data = self.__website_data(url, landing_page.title, landing_page.description, landing_page.text)
+        if not landing_page.contact_links or has_contact_information(landing_page.text):
+            return website_data
+
+        self.__landing_results[url] = website_data
+        contact_texts = await self.__crawl_contact_pages(session, url, landing_page.contact_links)
+        # A crawl cancelled by the stage deadline leaves the entry for __extract_website_data_async to report.
+        del self.__landing_results[url]
+        texts = [landing_page.text] if landing_page.text != TEXT_NOT_FOUND_MESSAGE else []
+        texts += contact_texts
+        return self.__website_data(url, landing_page.title, landing_page.description,
+                                   ' '.join(texts) if texts else landing_page.text)
+
+    def __conditional_headers(self, cached_response: CachedResponse | None) -> dict:
+        headers = {}
+        if cached_response is not None and cached_response.etag:
+            headers['If-None-Match'] = cached_response.etag
+        if cached_response is not None and cached_response.last_modified:
+            headers['If-Modified-Since'] = cached_response.last_modified
+        return headers
+
+    async def __request_website(self, session: aiohttp.ClientSession, url: str, host: str,
+                                cached_response: CachedResponse = None) -> tuple[str, bool]:
+        """
+        Performs a single attempt and returns the body and whether the host signalled congestion. A stale cached
+        response is revalidated and served again when the server answers 304 Not Modified.
+        """
+        # Waiting for a free slot happens before the request starts, so it does not count towards its timeout.
+        async with self.concurrency_controller.slot(host):
+            start_time = time.monotonic()
+            try:
+                async with session.get(url, timeout=CLIENT_TIMEOUT,
+                                       headers=self.__conditional_headers(cached_response)) as response:
+                    congested = response.status == 429 or response.status >= 500
+                    truncated = False
+                    if response.status == 304 and cached_response is not None:
+                        html_response = cached_response.body
+                        await self.http_cache.arefresh(url)
+                    elif STREAMING_FETCH['enabled']:
+                        html_response, truncated = await self.__read_html(response)
+                    else:
+                        html_response = await response.text()
+                    if response.status == 200 and html_response and self.http_cache is not None:
+                        await self.http_cache.aput(url, response.status, {
+                            name: response.headers[name] for name in CACHED_HEADERS if name in response.headers
+                        }, html_response, self.__read_limits() if truncated else '')
+            except asyncio.CancelledError:
+                # Cancelled by the stage deadline, which says nothing about the host.
+                raise
+            except (TimeoutError, aiohttp.ClientError) as e:
+                self.concurrency_controller.record(host, time.monotonic() - start_time, isinstance(e, TimeoutError))
+                raise
+            self.concurrency_controller.record(host, time.monotonic() - start_time, congested)
+            return html_response, congested
+
+    async def __fetch_website_data(self, session: aiohttp.ClientSession, url: str) -> dict:
+        cached_response = await self.__cached_response(url)
+        if cached_response is not None and self.http_cache.is_fresh(cached_response):
+            self.http_cache.hits += 1
+            try:
+                return await self.__landing_website_data(session, url, cached_response.body)
+            except Exception as e:
+                logging.info(f"Unexpected error parsing cached metadata for {url}: {e}")
+                self.other_errors += 1
+                return self.__website_data(url, METADATA_ERROR_MESSAGE, METADATA_ERROR_MESSAGE, "Text cannot be extracted")
+        if self.http_cache is not None:
+            self.http_cache.misses += 1
+
+        host = parse_url(url).host
+        if not self.circuit_breakers.allow_request(host):
+            logging.info(f"Circuit breaker open for {host}, skipping {url}")
+            return self.__not_fetched_website_data(url)
+
+        html_response, transient_error = None, None
+        for attempt in range(RETRIES['max_retries'] + 1):
+            try:
+                html_response, congested = await self.__request_website(session, url, host, cached_response)
+                transient_error = None
+                self.circuit_breakers.record(host, success=not congested)
+                if not congested:
+                    return await self.__landing_website_data(session, url, html_response)
+            except (TimeoutError, aiohttp.ClientConnectionError) as e:
+                self.circuit_breakers.record(host, success=False)
+                transient_error = e
+            except aiohttp.ClientError as e:
+                logging.info(f"Error fetching metadata for {url}: {e}")
+                self.client_errors += 1
+                return self.__website_data(url, METADATA_ERROR_MESSAGE, METADATA_ERROR_MESSAGE, "Text cannot be extracted")
+            except Exception as e:
+                logging.info(f"Unexpected error fetching metadata for {url}: {e}")
+                self.other_errors += 1
+                return self.__website_data(url, METADATA_ERROR_MESSAGE, METADATA_ERROR_MESSAGE, "Text cannot be extracted")
+
+            if attempt == RETRIES['max_retries'] or not self.circuit_breakers.allow_request(host):
+                break
+            self.retries += 1
+            await asyncio.sleep(self.__backoff_delay(attempt))
+
+        if transient_error is None:
+            # The last answer was a 429 or 5xx page, which is extracted like any other response.
+            try:
+                error_page = await self.__parse_website_data(html_response)
+                return self.__website_data(url, error_page.title, error_page.description, error_page.text)
+            except Exception as e:
+                logging.info(f"Unexpected error fetching metadata for {url}: {e}")
+                self.other_errors += 1
+        elif isinstance(transient_error, TimeoutError):
+            logging.info(f"Timeout error fetching metadata for {url}: {transient_error}")
+            self.timeout_errors += 1
+        else:
+            logging.info(f"Error fetching metadata for {url}: {transient_error}")
+            self.client_errors += 1
+        return self.__website_data(url, METADATA_ERROR_MESSAGE, METADATA_ERROR_MESSAGE, "Text cannot be extracted")
+
+    async def __extract_website_data_async(self, session: aiohttp.ClientSession) -> list[dict]:
+        tasks = [asyncio.ensure_future(self.__fetch_website_data(session, link)) for link in self.links]
+        if not tasks:
+            return []
+        timeout = max(0.0, self.deadline - time.monotonic()) if self.deadline is not None else None
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            logging.warning(f"Website extraction deadline reached with {len(pending)} urls unfinished")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        websites_data = [
+            task.result() if task not in pending else
+            self.__landing_results[link] if link in self.__landing_results else self.__not_fetched_website_data(link)
+            for link, task in zip(self.links, tasks)
+        ]
+        self.__landing_results.clear()
+        return websites_data
 
     def run(self) -> list[dict]:
-        websites_data = asyncio.run(self.__extract_website_data_async())
+        return asyncio.run(self.arun())
+
+    async def arun(self) -> list[dict]:
+        if self.session is not None:
+            websites_data = await self.__extract_website_data_async(self.session)
+        else:
+            async with create_client_session() as session:
+                websites_data = await self.__extract_website_data_async(session)
+        if self.http_cache is not None:
+            await asyncio.to_thread(self.http_cache.flush)
+        self.statistics = {
+            "total_errors": self.client_errors + self.timeout_errors + self.other_errors,
+            "client_errors": self.client_errors,
+            "timeout_errors": self.timeout_errors,
+            "other_errors": self.other_errors,
+            "retries": self.retries,
+            "not_fetched": self.not_fetched,
+            "non_html_responses": self.non_html_responses,
+            "truncated_responses": self.truncated_responses,
+            "bytes_read": self.bytes_read,
+            "crawled_sites": self.crawled_sites,
+            "contact_pages_fetched": self.contact_pages_fetched,
+            **self.concurrency_controller.statistics(),
+            **self.circuit_breakers.statistics(),
+            **(self.http_cache.statistics() if self.http_cache is not None else {})
+        }
         print(f"Request Adapter run finished!")
-        print(f"Total errors occurred: {self.client_errors + self.timeout_errors + self.other_errors}")
+        print(f"Total errors occurred: {self.statistics['total_errors']}")
         print(f"Total client occurred: {self.client_errors}")
         print(f"Total timeout occurred: {self.timeout_errors}")
         print(f"Total other errors occurred: {self.other_errors}")
+        print(f"Total retries: {self.retries}, websites not fetched: {self.not_fetched}")
+        if self.http_cache is not None:
+            print(f"HTTP cache: {self.http_cache.hits} hits, {self.http_cache.misses} misses, "
+                  f"{self.http_cache.revalidations} revalidated")
+        if SITE_CRAWL['enabled']:
+            print(f"Contact pages fetched: {self.contact_pages_fetched} from {self.crawled_sites} sites")
+        print(f"Bytes read: {self.bytes_read} ({self.truncated_responses} responses truncated, "
+              f"{self.non_html_responses} non HTML responses skipped)")
+        print(f"Concurrency window: {self.statistics['concurrency_window']} "
+              f"(per host {self.statistics['min_host_concurrency_window']}-{self.statistics['max_host_concurrency_window']}, "
+              f"{self.statistics['throttled_hosts']} hosts throttled)")
+        logging.info(f"Request Adapter statistics: {self.statistics}")
         return websites_data
\ No newline at end of file
@@ -0,0 +1,37 @@
+from typing import Iterable, Iterator
+from .basic_filter import BasicFilter
+
+import time
+import logging
+
+
+class TopKFilter(BasicFilter):
+    """
+    Passes link objects on until top_k of them carry the passing value in the given column or the time budget is
+    spent. Streamed, it stops pulling from the filters before it, so they never process the remaining links.
+    """
+    streaming = True
+
+    def __init__(self, column_name: str, passing_value, top_k: int = None, time_budget: float = None):
+        super().__init__()
+        self.__column_name = column_name
+        self.__passing_value = passing_value
+        self.__top_k = top_k
+        self.__time_budget = time_budget
+
+    def stream(self, link_objects: Iterable[dict]) -> Iterator[dict]:
+        started_at = time.monotonic()
+        passed = 0
+        for link_object in link_objects:
+            yield link_object
+            if link_object.get(self.__column_name) == self.__passing_value:
+                passed += 1
+            if self.__top_k is not None and passed >= self.__top_k:
+                logging.info(f"TopKFilter stopped after {passed} passing link objects")
+                return
+            if self.__time_budget is not None and time.monotonic() - started_at >= self.__time_budget:
+                logging.info(f"TopKFilter stopped after its {self.__time_budget}s time budget with {passed} passing link objects")
+                return
+
+    def run(self, link_objects: list[dict]) -> list[dict]:
+        return super().run(list(self.stream(link_objects)))
@@ -0,0 +1,109 @@
+from abc import ABC, abstractmethod
+from typing import NamedTuple
+
+import re
+import asyncio
+
+from .translation_batching import PACK_DELIMITER, unpack_translation
+
+# googletrans reports unexpected responses only through the message of a plain Exception.
+THROTTLED_STATUS_PATTERN = re.compile(r'status code "(429|503)"')
+
+
+class TranslationThrottledError(Exception):
+    """Raised by backends when the service rejects a request for exceeding its rate limits."""
+
+
+class RateLimit(NamedTuple):
+    requests_per_second: float | None
+    max_concurrency: int
+
+
+class TranslationBackend(ABC):
+    """
+    Translates batches of texts. Backends declare how many texts and characters fit into one request and the rate
+    limits of the service behind them; TranslationFilter packs texts and schedules requests accordingly.
+    """
+    name = 'backend'
+    max_batch_items = 1
+    max_batch_characters = 5000
+    rate_limit = RateLimit(None, 50)
+
+    @abstractmethod
+    async def translate_batch(self, texts: list[str], source_language: str, target_language: str) -> list[str]:
+        """
+        Returns one translation per text, in order, or raises when the batch could not be translated, with
+        TranslationThrottledError if the service asks to slow down.
+        """
+
+
+class GoogleTranslationBackend(TranslationBackend):
+    """
+    Public Google Translate endpoint through googletrans, packing a batch into one request with line breaks. A
+    translator with the same translate coroutine as googletrans' one may be passed instead, to run without network.
+    """
+    name = 'google'
+
+    def __init__(self, service_urls: list[str], max_batch_items: int = 50, max_batch_characters: int = 4500,
+                 requests_per_second: float = None, max_concurrency: int = 50, translator=None):
+        if translator is None:
+            from googletrans import Translator
+            # Otherwise failed requests, throttled ones included, come back as the untranslated text.
+            translator = Translator(service_urls=service_urls, raise_exception=True)
+        self._translator = translator
+        self.max_batch_items = max_batch_items
+        self.max_batch_characters = max_batch_characters
+        self.rate_limit = RateLimit(requests_per_second, max_concurrency)
+
+    async def __translate(self, text: str, source_language: str, target_language: str) -> str:
+        try:
+            translated_obj = await self._translator.translate(text, src=source_language, dest=target_language)
+        except Exception as e:
+            if THROTTLED_STATUS_PATTERN.search(str(e)):
+                raise TranslationThrottledError(str(e)) from e
+            raise
+        return translated_obj.text
+
+    async def translate_batch(self, texts: list[str], source_language: str, target_language: str) -> list[str]:
+        if len(texts) == 1:
+            return [await self.__translate(texts[0], source_language, target_language)]
+        if any(PACK_DELIMITER in text for text in texts):
+            raise ValueError("Texts containing the pack delimiter cannot be translated in one request")
+        translated_text = await self.__translate(PACK_DELIMITER.join(texts), source_language, target_language)
+        return unpack_translation(translated_text, len(texts))
+
+
+class DictionaryTranslationBackend(TranslationBackend):
+    """
+    Deterministic offline stand-in that replaces known words from a dictionary and keeps every other word, for
+    running and load testing the analyser without network access. An optional latency simulates round trips.
+    """
+    name = 'dictionary'
+
+    def __init__(self, dictionary: dict[str, str] = None, latency: float = 0.0, max_batch_items: int = 100,
+                 max_batch_characters: int = 100000, requests_per_second: float = None, max_concurrency: int = 50):
+        self.dictionary = {word.lower(): translation for word, translation in (dictionary or {}).items()}
+        self.latency = latency
+        self.max_batch_items = max_batch_items
+        self.max_batch_characters = max_batch_characters
+        self.rate_limit = RateLimit(requests_per_second, max_concurrency)
+
+    @classmethod
+    def from_file(cls, filepath: str | None, **kwargs) -> 'DictionaryTranslationBackend':
+        """Reads a tab separated file of word and translation pairs; without a file every text stays unchanged."""
+        dictionary = {}
+        if filepath:
+            with open(filepath, 'r', encoding='utf-8') as dictionary_file:
+                for line in dictionary_file:
+                    if '\t' in line and not line.startswith('#'):
+                        word, translation = line.rstrip('\n').split('\t', 1)
+                        dictionary[word.strip()] = translation.strip()
+        return cls(dictionary, **kwargs)
+
+    def __translate_word(self, match: re.Match) -> str:
+        return self.dictionary.get(match.group(0).lower(), match.group(0))
+
+    async def translate_batch(self, texts: list[str], source_language: str, target_language: str) -> list[str]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [re.sub(r'\w+', self.__translate_word, text) for text in texts]
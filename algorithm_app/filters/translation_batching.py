@@ -0,0 +1,31 @@
+# Texts reaching the translator have their non printable characters stripped, so a line break never occurs inside
+# one and survives translation as a separator between them.
+PACK_DELIMITER = '\n'
+
+
+def pack_texts(texts: list[str], max_characters: int, max_items: int) -> list[list[str]]:
+    """
+    Groups texts, in order, into packs whose delimited length stays within max_characters and that hold at most
+    max_items texts. A text longer than the limit on its own gets a pack of its own.
+    """
+    packs = []
+    current_pack, current_length = [], 0
+    for text in texts:
+        text_length = len(text) + (len(PACK_DELIMITER) if current_pack else 0)
+        if current_pack and (current_length + text_length > max_characters or len(current_pack) >= max_items):
+            packs.append(current_pack)
+            current_pack, current_length = [], 0
+            text_length = len(text)
+        current_pack.append(text)
+        current_length += text_length
+    if current_pack:
+        packs.append(current_pack)
+    return packs
+
+
+def unpack_translation(translated_text: str, expected_items: int) -> list[str]:
+    """Splits a packed translation back into its texts, raising ValueError when the separators did not survive."""
+    parts = translated_text.split(PACK_DELIMITER)
+    if len(parts) != expected_items:
+        raise ValueError(f"Packed translation returned {len(parts)} texts, expected {expected_items}")
+    return [part.strip() for part in parts]
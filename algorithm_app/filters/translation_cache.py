@@ -0,0 +1,154 @@
+from collections import OrderedDict
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+# Counting the stored translations scans the table, so the size limit is only enforced every so many writes.
+EVICTION_INTERVAL = 1000
+# Access times of disk hits are written back and committed together once every so many of them.
+COMMIT_INTERVAL = 100
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of a text for the cache key: NFC normalized with runs of whitespace collapsed."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def translation_key(text: str, source_language: str, target_language: str, backend_name: str) -> str:
+    text_hash = hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+    return f'{text_hash}:{source_language}:{target_language}:{backend_name}'
+
+
+class TranslationCache:
+    """
+    Two tier cache of translated texts keyed by (normalized text hash, source language, target language, backend): a
+    small in-memory LRU in front of a SQLite table that keeps translations between runs and is trimmed to max_entries
+    by least recent use. Keying by backend keeps the output of a local stand-in apart from real translations.
+    Access times of disk hits are written back in batches, on every put, flush and close.
+    """
+
+    def __init__(self, database_path: str, memory_size: int, max_entries: int):
+        self.database_path = database_path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__writes_since_eviction = EVICTION_INTERVAL
+        self.__memory = OrderedDict()
+        self.__pending_accesses = {}
+        self.__lock = threading.Lock()
+        self.__connection = None
+
+    def __getstate__(self) -> dict:
+        # SQLite connections and locks cannot be pickled, the copy in a worker process creates its own ones.
+        self.flush()
+        state = dict(self.__dict__)
+        state['_TranslationCache__connection'] = None
+        state['_TranslationCache__lock'] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __db(self) -> sqlite3.Connection:
+        if self.__connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.database_path)), exist_ok=True)
+            connection = sqlite3.connect(self.database_path, timeout=30, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS translations (
+                    translation_key TEXT PRIMARY KEY,
+                    translated_text TEXT NOT NULL,
+                    accessed_at REAL NOT NULL
+                )''')
+            connection.execute('CREATE INDEX IF NOT EXISTS translations_accessed_at ON translations (accessed_at)')
+            connection.commit()
+            self.__connection = connection
+        return self.__connection
+
+    def __flush(self) -> None:
+        if self.__pending_accesses:
+            self.__db().executemany('UPDATE translations SET accessed_at = ? WHERE translation_key = ?',
+                                    [(accessed_at, key) for key, accessed_at in self.__pending_accesses.items()])
+            self.__pending_accesses.clear()
+        if self.__connection is not None:
+            self.__connection.commit()
+
+    def flush(self) -> None:
+        """Writes back pending access times."""
+        with self.__lock:
+            self.__flush()
+
+    def __remember(self, key: str, translated_text: str) -> None:
+        self.__memory[key] = translated_text
+        self.__memory.move_to_end(key)
+        while len(self.__memory) > self.memory_size:
+            self.__memory.popitem(last=False)
+
+    def get(self, text: str, source_language: str, target_language: str, backend_name: str) -> str | None:
+        key = translation_key(text, source_language, target_language, backend_name)
+        with self.__lock:
+            if key in self.__memory:
+                self.__memory.move_to_end(key)
+                self.memory_hits += 1
+                return self.__memory[key]
+            row = self.__db().execute('SELECT translated_text FROM translations WHERE translation_key = ?',
+                                      (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.__pending_accesses[key] = time.time()
+            if len(self.__pending_accesses) >= COMMIT_INTERVAL:
+                self.__flush()
+            self.__remember(key, row[0])
+            self.disk_hits += 1
+            return row[0]
+
+    def put(self, text: str, source_language: str, target_language: str, backend_name: str,
+            translated_text: str) -> None:
+        key = translation_key(text, source_language, target_language, backend_name)
+        with self.__lock:
+            self.__remember(key, translated_text)
+            self.__pending_accesses.pop(key, None)
+            self.__db().execute(
+                'INSERT OR REPLACE INTO translations (translation_key, translated_text, accessed_at) VALUES (?, ?, ?)',
+                (key, translated_text, time.time()))
+            self.__writes_since_eviction += 1
+            if self.__writes_since_eviction >= EVICTION_INTERVAL:
+                # Eviction goes by access time, so pending ones are written back first.
+                self.__flush()
+                self.__evict()
+            self.__flush()
+
+    def __evict(self) -> None:
+        self.__writes_since_eviction = 0
+        excess = self.__db().execute('SELECT COUNT(*) FROM translations').fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.__db().execute('DELETE FROM translations WHERE translation_key IN '
+                                '(SELECT translation_key FROM translations ORDER BY accessed_at LIMIT ?)', (excess,))
+            self.evictions += excess
+
+    def statistics(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "translation_cache_memory_hits": self.memory_hits,
+            "translation_cache_disk_hits": self.disk_hits,
+            "translation_cache_misses": self.misses,
+            "translation_cache_evictions": self.evictions,
+            "translation_cache_hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__connection is not None:
+                self.__flush()
+                self.__connection.close()
+                self.__connection = None
@@ -1,123 +1,301 @@
 import asyncio
-from copy import deepcopy
+from typing import Iterable, Iterator
+import os
+import yaml
 import logging
 import string
-from .basic_filter import BasicFilter
+from .basic_filter import BasicFilter, with_fields
+from .rate_limiter import TokenBucket, get_rate_limiter
+from .translation_backends import (TranslationBackend, TranslationThrottledError, GoogleTranslationBackend,
+                                   DictionaryTranslationBackend)
+from .translation_batching import PACK_DELIMITER, pack_texts
+from .translation_cache import TranslationCache
+from ..language_detection import UNKNOWN_LANGUAGE, load_language_detector
+from ..utils import batched
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE_PATH = os.path.join(APP_DIR, '..', 'config.yaml')
+
+with open(CONFIG_FILE_PATH, 'r') as file:
+    config: dict = yaml.safe_load(file)
+
+SOURCE_LANGUAGE: str = config['translation_filter']['source_language']
+TARGET_LANGUAGE: str = config['translation_filter']['target_language']
+TRANSLATION_CACHE: dict = config['translation_filter']['cache']
+TRANSLATION_BACKEND: str = config['translation_filter']['backend']
+TRANSLATION_BACKENDS: dict = config['translation_filter']['backends']
+LANGUAGE_DETECTION: dict = config['translation_filter']['language_detection']
+RATE_LIMIT: dict = config['translation_filter']['rate_limit']
+TRANSLATION_CACHE_FILE_PATH = os.path.join(config['directories']['cache_dir'], TRANSLATION_CACHE['file'])
+
+TRANSLATION_FAILED_MESSAGE = "Translation failed"
+TRANSLATED_FIELDS = ('title', 'description')
+
+
+def create_translation_cache() -> TranslationCache | None:
+    if not TRANSLATION_CACHE['enabled']:
+        return None
+    return TranslationCache(TRANSLATION_CACHE_FILE_PATH, TRANSLATION_CACHE['memory_size'], TRANSLATION_CACHE['max_entries'])
+
+
+def create_translation_backend(backend_name: str = TRANSLATION_BACKEND) -> TranslationBackend:
+    settings = dict(TRANSLATION_BACKENDS[backend_name])
+    if backend_name == 'google':
+        return GoogleTranslationBackend(**settings)
+    if backend_name == 'dictionary':
+        dictionary_file = settings.pop('dictionary_file')
+        return DictionaryTranslationBackend.from_file(
+            os.path.join(APP_DIR, '..', dictionary_file) if dictionary_file else None, **settings)
+    raise ValueError(f"Unknown translation backend: {backend_name}")
 
 
 class TranslationFilter(BasicFilter):
+    streaming = True
+    asynchronous = True
 
-    def __init__(self, url_column_name: str, concurrency_limit: int = 50) -> None:
+    def __init__(self, url_column_name: str, concurrency_limit: int = 50, batch_size: int = 50,
+                 translation_cache: TranslationCache = None, backend: TranslationBackend = None) -> None:
         super().__init__()
         self.__url_column_name = url_column_name
-        from googletrans import Translator
-        self._translator = Translator(service_urls=['translate.googleapis.com'])
-        self._semaphore = asyncio.Semaphore(concurrency_limit)
-        logging.info(f"TranslationFilter initialized with concurrency limit: {concurrency_limit}")
+        self.__batch_size = batch_size
+        self.translation_cache = translation_cache if translation_cache is not None else create_translation_cache()
+        self.translation_requests = 0
+        self.throttle_events = 0
+        self.packed_fallbacks = 0
+        self.language_detector = load_language_detector() if LANGUAGE_DETECTION['enabled'] else None
+        self.detected_texts = 0
+        self.skipped_texts = 0
+        self.backend = backend if backend is not None else create_translation_backend()
+        self.concurrency_limit = min(concurrency_limit, self.backend.rate_limit.max_concurrency)
+        self.__request_semaphore = None
+        self.__loop = None
+        logging.info(f"TranslationFilter initialized with {self.backend.name} backend and concurrency limit: "
+                     f"{self.concurrency_limit}")
 
     def __remove_punctuation(self, text: str) -> str:
         return "".join([char for char in text if char not in string.punctuation])
 
-    async def __async_translate_text(self, text_object: dict) -> dict:
-        async with self._semaphore:
-            updated_object = deepcopy(text_object)
-            original_text = updated_object.get('text')
-            if not original_text or not isinstance(original_text, str) or not original_text.strip():
-                updated_object['text'] = 'Original text was empty or invalid'
-                return updated_object
-            logging.debug(f"Semaphore acquired. Translating: '{original_text[:50]}...'")
+    def __detect_language(self, link_object: dict) -> str:
+        """Detects the language of the title and description together, which is more reliable than either alone."""
+        text = ' '.join(link_object.get(field) for field in TRANSLATED_FIELDS
+                        if isinstance(link_object.get(field), str))
+        detected_language = self.language_detector.detect(text)
+        return detected_language.language if detected_language.confidence >= LANGUAGE_DETECTION['min_confidence'] \
+            else UNKNOWN_LANGUAGE
+
+    def __detect_languages(self, link_objects: list[dict]) -> list[str | None]:
+        return [self.__detect_language(link_object) if self.language_detector is not None else None
+                for link_object in link_objects]
+
+    def __is_translation_skipped(self, text: str, language: str | None) -> bool:
+        if self.language_detector is None:
+            return False
+        self.detected_texts += 1
+        if len(text.strip()) < LANGUAGE_DETECTION['min_characters'] or language == TARGET_LANGUAGE:
+            self.skipped_texts += 1
+            return True
+        return False
+
+    def __semaphore(self) -> asyncio.Semaphore:
+        if self.__loop is not asyncio.get_running_loop():
+            # The filter outlives the event loops of several runs, but the semaphore has to belong to the current one.
+            self.__loop = asyncio.get_running_loop()
+            self.__request_semaphore = asyncio.Semaphore(self.concurrency_limit)
+        return self.__request_semaphore
+
+    def __rate_limiter(self) -> TokenBucket:
+        return get_rate_limiter(self.backend.name, self.backend.rate_limit.requests_per_second, RATE_LIMIT['burst'],
+                                decrease_factor=RATE_LIMIT['decrease_factor'], backoff=RATE_LIMIT['throttle_backoff'],
+                                max_backoff=RATE_LIMIT['max_throttle_backoff'])
+
+    async def __translate_batch(self, texts: list[str]) -> list[str]:
+        """Sends one request under the rate limit shared with every job in the process, retrying throttled ones."""
+        rate_limiter = self.__rate_limiter()
+        for attempt in range(RATE_LIMIT['max_throttle_retries'] + 1):
+            async with self.__semaphore():
+                await rate_limiter.acquire()
+                logging.debug(f"Semaphore acquired. Translating {len(texts)} texts: '{texts[0][:50]}...'")
+                self.translation_requests += 1
+                try:
+                    translated_texts = await self.backend.translate_batch(texts, SOURCE_LANGUAGE, TARGET_LANGUAGE)
+                except TranslationThrottledError:
+                    self.throttle_events += 1
+                    rate_limiter.record_throttle()
+                    if attempt == RATE_LIMIT['max_throttle_retries']:
+                        raise
+                    continue
+            rate_limiter.record_success()
+            return translated_texts
+
+    async def __translate_text(self, text: str) -> str:
+        return (await self.__translate_batch([text]))[0]
+
+    async def __translate_pack(self, texts: list[str]) -> list[str | None]:
+        """Translates a pack of texts in one request, falling back to one request per text if that fails."""
+        if len(texts) > 1:
             try:
-                translated_obj = await self._translator.translate(original_text, dest='en')
-                translated_text_content = translated_obj.text
-                updated_object[
-                    'text'] = translated_text_content if translated_text_content else 'Translation resulted in empty text'
+                return await self.__translate_batch(texts)
+            except TranslationThrottledError as e:
+                # Splitting the pack up would only send more requests to a service that asks for fewer.
+                logging.warning(f"Translation of {len(texts)} texts still throttled after retries: {e}")
+                return [None] * len(texts)
             except Exception as e:
-                logging.warning(f"Error translating text (first 50 chars: '{original_text[:50]}...') occurred: {e}")
-                updated_object['text'] = "Translation failed"
-            return updated_object
+                logging.info(f"Packed translation of {len(texts)} texts failed, translating them one by one: {e}")
+                self.packed_fallbacks += 1
+        results = await asyncio.gather(*[self.__translate_text(text) for text in texts], return_exceptions=True)
+        for text, result in zip(texts, results):
+            if isinstance(result, Exception):
+                logging.warning(f"Error translating text (first 50 chars: '{text[:50]}...') occurred: {result}")
+        return [None if isinstance(result, Exception) else result for result in results]
+
+    def __known_translations(self, text_objects: list[dict]) -> tuple[list[dict | None], dict[str, list[int]]]:
+        """
+        Returns the fields of the text objects that need no request, skipped or cached, and the texts still to
+        translate, each with the positions of every text object holding it.
+        """
+        translated_fields: list[dict | None] = [None] * len(text_objects)
+        pending_texts: dict[str, list[int]] = {}
+        for index, text_object in enumerate(text_objects):
+            original_text = text_object.get('text')
+            if not original_text or not isinstance(original_text, str) or not original_text.strip():
+                translated_fields[index] = {'text': 'Original text was empty or invalid'}
+                continue
+            if self.__is_translation_skipped(original_text, text_object.get('language')):
+                translated_fields[index] = {'text': original_text}
+                continue
+            cached_translation = self.translation_cache.get(original_text, SOURCE_LANGUAGE, TARGET_LANGUAGE,
+                                                            self.backend.name) \
+                if self.translation_cache is not None else None
+            if cached_translation is not None:
+                translated_fields[index] = {'text': cached_translation}
+            else:
+                pending_texts.setdefault(original_text, []).append(index)
+        if self.translation_cache is not None:
+            # One commit for the access times of the whole batch.
+            self.translation_cache.flush()
+        return translated_fields, pending_texts
+
+    def __store_translations(self, translations: list[tuple[str, str]]) -> None:
+        for original_text, translated_text in translations:
+            self.translation_cache.put(original_text, SOURCE_LANGUAGE, TARGET_LANGUAGE, self.backend.name,
+                                       translated_text)
 
     async def __async_batch_translate_texts(self, text_objects: list[dict]) -> list[dict]:
         if not text_objects:
             return []
-        tasks = [self.__async_translate_text(text_object) for text_object in text_objects]
-        results = await asyncio.gather(*tasks, return_exceptions=False)
-        return results
+        # Cache lookups are SQLite queries, so they run off the event loop the translation requests share.
+        translated_fields, pending_texts = await asyncio.to_thread(self.__known_translations, text_objects)
 
-    async def _orchestrate_all_translations(self, titles_data: list[dict], descriptions_data: list[dict]) -> tuple[
-        list[dict], list[dict]]:
-        """Orchestrates title and description translations within a single async context."""
-        translated_titles_list = []
-        translated_descriptions_list = []
+        packable_texts = [text for text in pending_texts if PACK_DELIMITER not in text]
+        packs = pack_texts(packable_texts, self.backend.max_batch_characters, self.backend.max_batch_items)
+        packs += [[text] for text in pending_texts if PACK_DELIMITER in text]
+        translated_packs = await asyncio.gather(*[self.__translate_pack(pack) for pack in packs])
 
-        if titles_data:
-            logging.info(f"Orchestrating translation for {len(titles_data)} titles.")
-            translated_titles_list = await self.__async_batch_translate_texts(titles_data)
+        new_translations = []
+        for pack, translated_texts in zip(packs, translated_packs):
+            for original_text, translated_text in zip(pack, translated_texts):
+                if translated_text is None:
+                    fields = {'text': TRANSLATION_FAILED_MESSAGE}
+                elif not translated_text:
+                    fields = {'text': 'Translation resulted in empty text'}
+                else:
+                    fields = {'text': translated_text}
+                    new_translations.append((original_text, translated_text))
+                for index in pending_texts[original_text]:
+                    translated_fields[index] = fields
+        if self.translation_cache is not None and new_translations:
+            await asyncio.to_thread(self.__store_translations, new_translations)
+        return [with_fields(text_object, fields) for text_object, fields in zip(text_objects, translated_fields)]
 
-        if descriptions_data:
-            logging.info(f"Orchestrating translation for {len(descriptions_data)} descriptions.")
-            translated_descriptions_list = await self.__async_batch_translate_texts(descriptions_data)
+    async def _orchestrate_all_translations(self, fields_data: dict[str, list[dict]]) -> dict[str, list[dict]]:
+        """
+        Translates the texts of every field as one batch, so their requests run concurrently and a text occurring in
+        several fields is translated once.
+        """
+        logging.info("Orchestrating translation for " +
+                     ", ".join(f"{len(field_data)} {field} texts" for field, field_data in fields_data.items()))
+        translated_texts = await self.__async_batch_translate_texts(
+            [text_object for field_data in fields_data.values() for text_object in field_data])
+        translated_fields_data = {}
+        offset = 0
+        for field, field_data in fields_data.items():
+            translated_fields_data[field] = translated_texts[offset:offset + len(field_data)]
+            offset += len(field_data)
+        return translated_fields_data
 
-        return translated_titles_list, translated_descriptions_list
+    def statistics(self) -> dict:
+        return {
+            "translation_requests": self.translation_requests,
+            "translation_throttle_events": self.throttle_events,
+            "packed_translation_fallbacks": self.packed_fallbacks,
+            "language_detected_texts": self.detected_texts,
+            "language_skipped_texts": self.skipped_texts,
+            **self.__rate_limiter().statistics(),
+            **(self.translation_cache.statistics() if self.translation_cache is not None else {})
+        }
 
-    def run(self, link_objects: list[dict]) -> list[dict]:
+    async def __translate_link_objects(self, link_objects: list[dict]) -> list[dict]:
         if not link_objects:
             logging.info("No link objects to process.")
             return []
-        updated_link_objects = deepcopy(link_objects)
-
-        titles_data = [
-            {
-                self.__url_column_name: link_object[self.__url_column_name],
-                'text': self.__remove_punctuation(link_object['title'])
-            } for link_object in updated_link_objects if
-            link_object.get('title') and link_object.get(self.__url_column_name)
-        ]
-        descriptions_data = [
-            {
-                self.__url_column_name: link_object[self.__url_column_name],
-                'text': self.__remove_punctuation(link_object['description'])
-            } for link_object in updated_link_objects if
-            link_object.get('description') and link_object.get(self.__url_column_name)
-        ]
-
-        translated_titles_list = []
-        translated_descriptions_list = []
-
-        try:
-            current_loop = asyncio.get_running_loop()
-            if current_loop.is_running():
-                logging.error("TranslationFilter.run() was called from an already running event loop. "
-                              "This method should be made 'async def' or called from a synchronous context.")
-
-        except RuntimeError:
-            pass
-
-        if titles_data or descriptions_data:
+        # Language detection is CPU bound, so it runs off the event loop the translation requests share.
+        languages = await asyncio.to_thread(self.__detect_languages, link_objects)
+        fields_data = {
+            field: [
+                {
+                    self.__url_column_name: link_object[self.__url_column_name],
+                    'text': self.__remove_punctuation(link_object[field]),
+                    'language': language
+                } for link_object, language in zip(link_objects, languages) if
+                link_object.get(field) and link_object.get(self.__url_column_name)
+            ] for field in TRANSLATED_FIELDS
+        }
+        fields_data = {field: field_data for field, field_data in fields_data.items() if field_data}
+
+        translated_fields_data = {}
+
+        if fields_data:
             try:
                 logging.info("Starting orchestrated translations.")
-                translated_titles_list, translated_descriptions_list = asyncio.run(
-                    self._orchestrate_all_translations(titles_data, descriptions_data)
-                )
+                translated_fields_data = await self._orchestrate_all_translations(fields_data)
                 logging.info("Finished orchestrated translations.")
+                statistics = self.statistics()
+                logging.info(f"Translation statistics: {statistics}")
+                print(f"Translation requests: {self.translation_requests} ({self.throttle_events} throttled, "
+                      f"{self.packed_fallbacks} packs split up), rate limit: "
+                      f"{statistics['rate_limit_requests_per_second'] or 'none'} requests per second")
+                if self.language_detector is not None:
+                    logging.info(f"Language detection skipped {self.skipped_texts} of {self.detected_texts} texts "
+                                 f"(skip ratio {self.skipped_texts / self.detected_texts if self.detected_texts else 0:.2f})")
             except Exception as e:
                 logging.error(f'Error occurred during orchestrated translations: {e}')
         else:
             logging.info("No titles or descriptions to translate.")
 
-        translated_titles_map = {
-            item[self.__url_column_name]: item['text']
-            for item in translated_titles_list if
-            isinstance(item, dict) and self.__url_column_name in item and 'text' in item
-        }
-        translated_descriptions_map = {
-            item[self.__url_column_name]: item['text']
-            for item in translated_descriptions_list if
-            isinstance(item, dict) and self.__url_column_name in item and 'text' in item
+        translated_maps = {
+            field: {
+                item[self.__url_column_name]: item['text']
+                for item in translated_field_data if
+                isinstance(item, dict) and self.__url_column_name in item and 'text' in item
+            } for field, translated_field_data in translated_fields_data.items()
         }
-        for link_object in updated_link_objects:
+        updated_link_objects = []
+        for link_object, language in zip(link_objects, languages):
             url = link_object.get(self.__url_column_name)
-            if not url: continue
-            if url in translated_titles_map: link_object['title'] = translated_titles_map[url]
-            if url in translated_descriptions_map: link_object['description'] = translated_descriptions_map[url]
+            translated_fields = {'language': language} if language is not None else {}
+            for field, translated_map in translated_maps.items():
+                if url and url in translated_map: translated_fields[field] = translated_map[url]
+            updated_link_objects.append(with_fields(link_object, translated_fields) if translated_fields else link_object)
+        return updated_link_objects
+
+    def stream(self, link_objects: Iterable[dict]) -> Iterator[dict]:
+        # One event loop for every batch, so the translator client keeps its connections between them.
+        with asyncio.Runner() as runner:
+            for link_objects_batch in batched(link_objects, self.__batch_size):
+                yield from runner.run(self.__translate_link_objects(link_objects_batch))
+
+    def run(self, link_objects: list[dict]) -> list[dict]:
+        return asyncio.run(self.arun(link_objects))
 
-        return super().run(updated_link_objects)
\ No newline at end of file
+    async def arun(self, link_objects: list[dict]) -> list[dict]:
+        return super().run(await self.__translate_link_objects(link_objects))
\ No newline at end of file
@@ -1,35 +1,80 @@
-from copy import deepcopy
-from .basic_filter import BasicFilter
-from .request_adapter import RequestAdapter
+from typing import Iterable, Iterator
+from .basic_filter import BasicFilter, with_fields
+from .request_adapter import (RequestAdapter, STAGE_DEADLINE, create_circuit_breakers, create_client_session,
+                              create_concurrency_controller, create_http_cache)
+from ..utils import batched, clean_text
 
-import re
+import time
+import asyncio
+import aiohttp
 
 
 class WebsiteDataExtractionFilter(BasicFilter):
+    streaming = True
+    asynchronous = True
 
-    def __init__(self, url_column_name: str, num_occurrences_column_name: str, location_column_name: str):
+    def __init__(self, url_column_name: str, num_occurrences_column_name: str, location_column_name: str,
+                 batch_size: int = 50, time_budget: float = None, session: aiohttp.ClientSession = None):
+        """
+        A time budget in seconds shortens the configured stage deadline for fetching websites. A session shares its
+        connection pool with the other filters and adapters on its event loop and is left open; only arun uses it,
+        as stream runs on an event loop of its own.
+        """
         super().__init__()
         self.__url_column_name = url_column_name
         self.__num_occurrences_column_name = num_occurrences_column_name
         self.__location_column_name = location_column_name
+        self.__batch_size = batch_size
+        self.__time_budget = time_budget
+        # Shared by every batch so the learned concurrency windows and open circuits carry over between them.
+        self.__concurrency_controller = create_concurrency_controller()
+        self.__circuit_breakers = create_circuit_breakers()
+        self.__http_cache = create_http_cache()
+        self.__deadline = None
+        self.session = session
 
-    def __clean_text(self, text):
-        return re.sub(r'[^\x20-\x7E]', '', text)
+    async def __extract_website_data(self, link_objects: list[dict], session: aiohttp.ClientSession) -> list[dict]:
+        urls = [link_object[self.__url_column_name] for link_object in link_objects]
+        request_adapter = RequestAdapter(urls, self.__concurrency_controller, self.__circuit_breakers, self.__deadline,
+                                         self.__http_cache, session)
+        website_data_results = await request_adapter.arun()
+        website_data_by_url = {
+            website_data[self.__url_column_name]: {
+                'title': clean_text(website_data['title']),
+                'description': clean_text(website_data['description']),
+                'text': clean_text(website_data['text']) # f"{text[:500]}..." if len(text) > 500 else text
+            } for website_data in website_data_results
+        }
+        return [
+            with_fields(link_object, website_data_by_url[link_object[self.__url_column_name]])
+            if link_object[self.__url_column_name] in website_data_by_url else link_object
+            for link_object in link_objects
+        ]
+
+    def __start_deadline(self) -> None:
+        deadlines = [seconds for seconds in (STAGE_DEADLINE, self.__time_budget) if seconds is not None]
+        self.__deadline = time.monotonic() + min(deadlines) if deadlines else None
+
+    async def __open_session(self) -> aiohttp.ClientSession:
+        return create_client_session()
+
+    def stream(self, link_objects: Iterable[dict]) -> Iterator[dict]:
+        self.__start_deadline()
+        # One event loop for every batch, so their requests reuse the same pooled connections.
+        with asyncio.Runner() as runner:
+            session = runner.run(self.__open_session())
+            try:
+                for link_objects_batch in batched(link_objects, self.__batch_size):
+                    yield from runner.run(self.__extract_website_data(link_objects_batch, session))
+            finally:
+                runner.run(session.close())
 
     def run(self, link_objects: list[dict]) -> list[dict]:
-        updated_link_objects = deepcopy(link_objects)
-        urls = [link_object[self.__url_column_name] for link_object in updated_link_objects]
-        request_adapter = RequestAdapter(urls)
-        website_data_results = request_adapter.run()
-        for website_data in website_data_results:
-            url = website_data[self.__url_column_name]
-            title = self.__clean_text(website_data['title'])
-            description = self.__clean_text(website_data['description'])
-            text = self.__clean_text(website_data['text'])
-            for link_object in updated_link_objects:
-                if link_object[self.__url_column_name] == url:
-                    link_object['title'] = title
-                    link_object['description'] = description
-                    link_object['text'] = text # f"{text[:500]}..." if len(text) > 500 else text
-
-        return super().run(updated_link_objects)
\ No newline at end of file
+        return asyncio.run(self.arun(link_objects))
+
+    async def arun(self, link_objects: list[dict]) -> list[dict]:
+        self.__start_deadline()
+        if self.session is not None:
+            return super().run(await self.__extract_website_data(link_objects, self.session))
+        async with create_client_session() as session:
+            return super().run(await self.__extract_website_data(link_objects, session))
\ No newline at end of file
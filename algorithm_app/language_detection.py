@@ -0,0 +1,100 @@
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, NamedTuple
+
+import os
+import re
+import math
+import yaml
+
+from .utils import clean_text
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE_PATH = os.path.join(APP_DIR, 'config.yaml')
+
+with open(CONFIG_FILE_PATH, 'r') as file:
+    config: dict = yaml.safe_load(file)
+
+LANGUAGE_SAMPLES_FILE_PATH: str = os.path.join(APP_DIR, config['language_detection']['samples_file'])
+NGRAM_SIZES: tuple[int, ...] = tuple(config['language_detection']['ngram_sizes'])
+UNKNOWN_LANGUAGE = 'unknown'
+
+
+class DetectedLanguage(NamedTuple):
+    language: str
+    confidence: float
+
+
+def character_ngrams(text: str, ngram_sizes: Iterable[int] = NGRAM_SIZES) -> list[str]:
+    """Character n-grams of the lowercased words of a text, each word padded with spaces to mark its edges."""
+    ngrams = []
+    for word in re.findall(r"[^\W\d_]+", text.lower()):
+        padded_word = f' {word} '
+        for size in ngram_sizes:
+            ngrams.extend(padded_word[index:index + size] for index in range(len(padded_word) - size + 1))
+    return ngrams
+
+
+def read_language_samples(filepath: str) -> dict[str, str]:
+    samples = {}
+    language = None
+    with open(filepath, 'r', encoding='utf-8') as samples_file:
+        for line in samples_file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                language = line[1:-1]
+                samples[language] = ''
+            elif language is not None:
+                samples[language] += f' {line}'
+    return samples
+
+
+class NgramLanguageDetector:
+    """
+    Naive Bayes language identification over character n-grams with add-one smoothing. Works offline from a small
+    bundled corpus, which is enough to tell the languages of website titles and descriptions apart.
+    """
+
+    def __init__(self, samples: dict[str, str], ngram_sizes: Iterable[int] = NGRAM_SIZES):
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.log_probabilities: dict[str, dict[str, float]] = {}
+        self.unseen_log_probabilities: dict[str, float] = {}
+        vocabulary = set()
+        counts = {language: Counter(character_ngrams(text, self.ngram_sizes)) for language, text in samples.items()}
+        for language_counts in counts.values():
+            vocabulary.update(language_counts)
+        for language, language_counts in counts.items():
+            total = sum(language_counts.values()) + len(vocabulary)
+            self.log_probabilities[language] = {
+                ngram: math.log((count + 1) / total) for ngram, count in language_counts.items()
+            }
+            self.unseen_log_probabilities[language] = math.log(1 / total)
+
+    @classmethod
+    def from_file(cls, filepath: str) -> 'NgramLanguageDetector':
+        return cls(read_language_samples(filepath))
+
+    def detect(self, text: str) -> DetectedLanguage:
+        """
+        Returns the most likely language with a confidence between 0 and 1: the share of the probability mass the
+        best language holds against the runner up, per n-gram, so it does not grow with the text length alone.
+        """
+        ngrams = character_ngrams(text, self.ngram_sizes)
+        if not ngrams:
+            return DetectedLanguage(UNKNOWN_LANGUAGE, 0.0)
+        scores = sorted((
+            (sum(log_probabilities.get(ngram, self.unseen_log_probabilities[language]) for ngram in ngrams), language)
+            for language, log_probabilities in self.log_probabilities.items()
+        ), reverse=True)
+        (best_score, best_language), (second_score, _) = scores[0], scores[1]
+        margin = (best_score - second_score) / len(ngrams)
+        return DetectedLanguage(best_language, 1 - math.exp(-margin * len(self.ngram_sizes)))
+
+
+@lru_cache(maxsize=1)
+def load_language_detector() -> NgramLanguageDetector:
+    # Page texts reach the detector without their non-ASCII characters, so every sample is learned in both forms.
+    samples = read_language_samples(LANGUAGE_SAMPLES_FILE_PATH)
+    return NgramLanguageDetector({language: f'{text} {clean_text(text)}' for language, text in samples.items()})
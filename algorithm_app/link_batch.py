@@ -0,0 +1,103 @@
+import sys
+
+from collections.abc import Sequence
+from typing import Any, Iterable, Iterator
+
+
+class _Missing:
+    # Placeholder for fields a link object does not have, pickled by reference so identity checks survive spilling.
+    def __repr__(self) -> str:
+        return 'MISSING'
+
+    def __reduce__(self) -> str:
+        return 'MISSING'
+
+
+MISSING = _Missing()
+
+
+class LinkBatch(Sequence):
+    """
+    Columnar batch of link objects, holding one list per field instead of one dict per link.
+    String values of the interned columns are deduplicated with sys.intern, so repeated locations and domains
+    are stored once. Iterating or indexing a batch yields plain link object dicts, so filters that are not
+    column aware keep working on it unchanged.
+    """
+    __slots__ = ('columns', 'interned_column_names', '_length')
+
+    def __init__(self, columns: dict[str, list] = None, interned_column_names: Iterable[str] = ()):
+        self.columns = columns if columns is not None else {}
+        self.interned_column_names = frozenset(interned_column_names)
+        self._length = len(next(iter(self.columns.values()))) if self.columns else 0
+
+    @classmethod
+    def from_records(cls, link_objects: Iterable[dict], interned_column_names: Iterable[str] = ()) -> 'LinkBatch':
+        link_batch = cls(interned_column_names=interned_column_names)
+        for link_object in link_objects:
+            link_batch.append(link_object)
+        return link_batch
+
+    def to_records(self) -> list[dict]:
+        return list(self)
+
+    def __intern(self, column_name: str, value: Any) -> Any:
+        if column_name in self.interned_column_names and type(value) is str:
+            return sys.intern(value)
+        return value
+
+    def append(self, link_object: dict) -> None:
+        """Adds a link object while the batch is being built, before it is handed to any filter."""
+        for column_name in link_object.keys() - self.columns.keys():
+            self.columns[column_name] = [MISSING] * self._length
+        for column_name, values in self.columns.items():
+            values.append(self.__intern(column_name, link_object.get(column_name, MISSING)))
+        self._length += 1
+
+    def column(self, column_name: str) -> list:
+        # A batch read from an empty or unreadable file has no columns yet, but every column of it is empty.
+        if not self._length and column_name not in self.columns:
+            return []
+        return self.columns[column_name]
+
+    def with_column(self, column_name: str, values: list) -> 'LinkBatch':
+        """Returns a new batch with one column replaced or added, sharing every other column with this batch."""
+        if len(values) != self._length:
+            raise ValueError(f"Column '{column_name}' has {len(values)} values, expected {self._length}")
+        columns = dict(self.columns)
+        columns[column_name] = [self.__intern(column_name, value) for value in values] \
+            if column_name in self.interned_column_names else values
+        return LinkBatch(columns, self.interned_column_names)
+
+    def take(self, indexes: Iterable[int]) -> 'LinkBatch':
+        indexes = list(indexes)
+        columns = {column_name: [values[index] for index in indexes] for column_name, values in self.columns.items()}
+        link_batch = LinkBatch(columns, self.interned_column_names)
+        link_batch._length = len(indexes)
+        return link_batch
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(self._length)))
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('LinkBatch index out of range')
+        return {column_name: values[index] for column_name, values in self.columns.items() if values[index] is not MISSING}
+
+    def __iter__(self) -> Iterator[dict]:
+        column_items = list(self.columns.items())
+        for index in range(self._length):
+            yield {column_name: values[index] for column_name, values in column_items if values[index] is not MISSING}
+
+    def __repr__(self) -> str:
+        return f"LinkBatch({self._length} links, columns={list(self.columns)})"
+
+
+def column_values(link_objects: Iterable[dict], column_name: str) -> list:
+    """Returns one field of every link object, reading the column directly when given a LinkBatch."""
+    if isinstance(link_objects, LinkBatch):
+        return link_objects.column(column_name)
+    return [link_object[column_name] for link_object in link_objects]
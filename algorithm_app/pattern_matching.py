@@ -0,0 +1,81 @@
+from collections import deque
+from typing import Iterable
+
+
+class AhoCorasickMatcher:
+    """Multi-pattern substring matcher whose scan time depends on the text length, not on the number of patterns."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.__transitions: list[dict[str, int]] = [{}]
+        self.__failures: list[int] = [0]
+        self.__terminal: list[bool] = [False]
+        for pattern in patterns:
+            if pattern:
+                self.__add_pattern(pattern)
+        self.__build_failure_links()
+
+    def __add_pattern(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self.__transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self.__transitions)
+                self.__transitions.append({})
+                self.__failures.append(0)
+                self.__terminal.append(False)
+                self.__transitions[state][char] = next_state
+            state = next_state
+        self.__terminal[state] = True
+
+    def __build_failure_links(self) -> None:
+        queue = deque(self.__transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.__transitions[state].items():
+                failure = self.__failures[state]
+                while failure and char not in self.__transitions[failure]:
+                    failure = self.__failures[failure]
+                self.__failures[next_state] = self.__transitions[failure].get(char, 0)
+                # A state also matches when any pattern ending in its longest proper suffix matches.
+                self.__terminal[next_state] = self.__terminal[next_state] or self.__terminal[self.__failures[next_state]]
+                queue.append(next_state)
+
+    def contains_any(self, text: str) -> bool:
+        transitions, failures, terminal = self.__transitions, self.__failures, self.__terminal
+        state = 0
+        for char in text:
+            while state and char not in transitions[state]:
+                state = failures[state]
+            state = transitions[state].get(char, 0)
+            if terminal[state]:
+                return True
+        return False
+
+
+class DomainSuffixTrie:
+    """Trie over reversed domain labels, matching a host when it equals or is a subdomain of a stored domain."""
+
+    __END = '.'
+
+    def __init__(self, domains: Iterable[str]):
+        self.__root: dict = {}
+        for domain in domains:
+            domain = domain.strip().lower().strip('.')
+            if domain:
+                self.__add_domain(domain)
+
+    def __add_domain(self, domain: str) -> None:
+        node = self.__root
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        node[self.__END] = True
+
+    def matches(self, host: str) -> bool:
+        node = self.__root
+        for label in reversed(host.lower().split('.')):
+            node = node.get(label)
+            if node is None:
+                return False
+            if self.__END in node:
+                return True
+        return False
@@ -1,19 +1,291 @@
-from .filters import BasicFilter
-from .utils import annotate, append_to_json_file
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Iterator, Sequence
+
+import os
+import asyncio
+import logging
+import pickle
+import shutil
+import tempfile
+
+from .filters import BasicFilter, FusedFilter
+from .utils import append_to_json_file, timed
+
+EXECUTOR_TYPES = ('sequential', 'thread', 'process')
+
+
+class FilterExecutionError(RuntimeError):
+    """Raised when a pipeline filter fails or returns no result, naming the filter so the run stops right there."""
+
+    def __init__(self, index: int, pipeline_filter: BasicFilter, reason: str):
+        super().__init__(f"Pipeline filter {index} ({type(pipeline_filter).__name__}) {reason}")
+        self.index = index
+
+
+@timed
+def execute_filter(pipeline_filter: BasicFilter, params: list[dict]) -> list[dict]:
+    return pipeline_filter.run(*params)
+
+
+def _run_filter(pipeline_filter: BasicFilter, params: list[list[dict]]) -> list[dict]:
+    # Module level so it can be pickled when the pipeline runs on a process pool.
+    return execute_filter(pipeline_filter, params)
+
+
+def _run_filter_in_process(pipeline_filter: BasicFilter, params: list[list[dict]]) -> tuple[list[dict], BasicFilter]:
+    """Runs a filter in a worker process, returning the filter as well so counters and statistics survive the copy."""
+    result = execute_filter(pipeline_filter, params)
+    pipeline_filter.result_link_objects = None
+    return result, pipeline_filter
+
+
+@timed
+async def aexecute_filter(pipeline_filter: BasicFilter, params: list[dict]) -> list[dict]:
+    return await pipeline_filter.arun(*params)
+
+
+class SpilledResult:
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+
+    @classmethod
+    def dump(cls, link_objects: list[dict], spill_dir: str, index: int) -> 'SpilledResult':
+        filepath = os.path.join(spill_dir, f'filter_{index}.pickle')
+        with open(filepath, 'wb') as file:
+            pickle.dump(link_objects, file, protocol=pickle.HIGHEST_PROTOCOL)
+        return cls(filepath)
+
+    def load(self) -> list[dict]:
+        with open(self.filepath, 'rb') as file:
+            return pickle.load(file)
+
+    def remove(self) -> None:
+        if os.path.exists(self.filepath):
+            os.remove(self.filepath)
 
 
 class Pipeline:
-    def __init__(self, filters: list[list[int, list[int], BasicFilter]], base_link_objects: list[dict]):
+    def __init__(self, filters: list[list[int, list[int], BasicFilter]], base_link_objects: list[dict],
+                 executor_type: str = 'thread', max_workers: int = 4,
+                 release_intermediate_results: bool = True, spill_dir: str = None, fuse_row_filters: bool = True):
+        if executor_type not in EXECUTOR_TYPES:
+            raise ValueError(f"Unknown pipeline executor type '{executor_type}', expected one of {EXECUTOR_TYPES}")
         self.filters = filters
         self.base_link_objects = base_link_objects
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.release_intermediate_results = release_intermediate_results
+        self.spill_dir = spill_dir
+        self.execution_order = self.__topological_order()
+        if fuse_row_filters:
+            self.filters = self.__fuse_row_local_filters()
+            self.execution_order = self.__topological_order()
+        if executor_type == 'process':
+            self.__check_picklable()
+
+    def __topological_order(self) -> list[int]:
+        """Validates the filter graph and returns filter indexes in a dependency respecting order."""
+        dependencies = {}
+        for filter_index, filter_receive_indexes, _ in self.filters:
+            if filter_index == 0:
+                raise ValueError("Filter index 0 is reserved for the base link objects")
+            if filter_index in dependencies:
+                raise ValueError(f"Duplicate filter index {filter_index}")
+            dependencies[filter_index] = list(filter_receive_indexes)
+
+        for filter_index, filter_receive_indexes in dependencies.items():
+            missing_indexes = [index for index in filter_receive_indexes if index and index not in dependencies]
+            if missing_indexes:
+                raise ValueError(f"Filter {filter_index} receives missing inputs {missing_indexes}")
 
-    @annotate
-    def execute_filter(self, pipeline_filter: BasicFilter, params: list[dict]) -> list[dict]:
-        return pipeline_filter.run(*params)
+        order = []
+        done = {0}
+        pending = dict(dependencies)
+        while pending:
+            ready = [index for index, inputs in pending.items() if all(i in done for i in inputs)]
+            if not ready:
+                raise ValueError(f"Pipeline contains a dependency cycle between filters {sorted(pending)}")
+            for index in ready:
+                order.append(index)
+                done.add(index)
+                del pending[index]
+        return order
+
+    def __fuse_row_local_filters(self) -> list[list[int, list[int], BasicFilter]]:
+        """
+        Merges chains of single input row local filters, where each link of the chain is the only consumer of the
+        previous one, into a FusedFilter registered under the index of the last filter in the chain.
+        """
+        dependencies = {index: inputs for index, inputs, _ in self.filters}
+        reference_counts = Counter(i for inputs in dependencies.values() for i in inputs)
+        chains = {}
+        for index in self.execution_order:
+            inputs, pipeline_filter = dependencies[index], self.__filter_by_index(index)
+            previous_chain = chains.get(inputs[0]) if len(inputs) == 1 else None
+            if pipeline_filter.row_local and previous_chain and previous_chain[2] and reference_counts[inputs[0]] == 1:
+                previous_indexes, chain_inputs, _, chain_filters = chains.pop(inputs[0])
+                chains[index] = [previous_indexes + [index], chain_inputs, True, chain_filters + [pipeline_filter]]
+            else:
+                chains[index] = [[index], inputs, pipeline_filter.row_local and len(inputs) == 1, [pipeline_filter]]
+
+        fused_filters = []
+        for index, _, _ in self.filters:
+            if index not in chains:
+                continue
+            chain_indexes, chain_inputs, _, chain_filters = chains[index]
+            if len(chain_filters) > 1:
+                logging.info(f"Fusing pipeline filters {chain_indexes} into a single pass")
+                fused_filters.append([index, chain_inputs, FusedFilter(chain_filters)])
+            else:
+                fused_filters.append([index, chain_inputs, chain_filters[0]])
+        return fused_filters
+
+    def __check_picklable(self) -> None:
+        """Filters handed to worker processes are pickled, so filters holding clients, locks or loops are rejected."""
+        for index, _, pipeline_filter in self.filters:
+            if pipeline_filter.asynchronous:
+                continue
+            try:
+                pickle.dumps(pipeline_filter, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                raise ValueError(f"Pipeline filter {index} ({type(pipeline_filter).__name__}) cannot run on the "
+                                 f"process executor, it cannot be pickled: {e}") from e
+
+    def __filter_by_index(self, index: int) -> BasicFilter:
+        for filter_index, _, pipeline_filter in self.filters:
+            if filter_index == index:
+                return pipeline_filter
+
+    def __create_executor(self) -> Executor:
+        if self.executor_type == 'process':
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(max_workers=self.max_workers if self.executor_type == 'thread' else 1)
+
+    def __release_result(self, results: dict, index: int) -> None:
+        result = results.pop(index)
+        if isinstance(result, SpilledResult):
+            result.remove()
+        if index:
+            self.__filter_by_index(index).result_link_objects = None
+
+    def __spill_result(self, results: dict, index: int, spill_dir: str) -> None:
+        results[index] = SpilledResult.dump(results[index], spill_dir, index)
+        if index:
+            self.__filter_by_index(index).result_link_objects = None
+
+    def __start_filter(self, pipeline_filter: BasicFilter, params: list[list[dict]], executor: Executor) -> asyncio.Future:
+        if pipeline_filter.asynchronous:
+            return asyncio.ensure_future(aexecute_filter(pipeline_filter, params))
+        if self.executor_type == 'process':
+            return asyncio.get_running_loop().run_in_executor(executor, _run_filter_in_process, pipeline_filter, params)
+        return asyncio.get_running_loop().run_in_executor(executor, _run_filter, pipeline_filter, params)
+
+    def __filter_result(self, index: int, future: asyncio.Future) -> list[dict]:
+        pipeline_filter = self.__filter_by_index(index)
+        try:
+            result = future.result()
+        except Exception as e:
+            raise FilterExecutionError(index, pipeline_filter, f"failed: {e!r}") from e
+        if self.executor_type == 'process' and not pipeline_filter.asynchronous:
+            result, worker_filter = result
+            pipeline_filter.__dict__.update(worker_filter.__dict__)
+            pipeline_filter.result_link_objects = result
+        if result is None:
+            raise FilterExecutionError(index, pipeline_filter, "returned no result")
+        return result
 
     def run(self) -> list[dict]:
-        link_objects = self.base_link_objects
-        for filter_index, filter_receive_indexes, pipeline_filter in self.filters:
-            params = [self.filters[index-1][2].result_link_objects if index else self.base_link_objects for index in filter_receive_indexes]
-            link_objects = self.execute_filter(pipeline_filter, params)
-        return link_objects
\ No newline at end of file
+        return asyncio.run(self.arun())
+
+    async def arun(self) -> list[dict]:
+        """
+        Runs the pipeline on the running event loop: asynchronous filters are awaited on it, sharing the loop and
+        its connections with other pipelines on the same loop, the rest run on the executor.
+        """
+        results = {0: self.base_link_objects}
+        dependencies = {index: inputs for index, inputs, _ in self.filters}
+        final_index = self.filters[-1][0]
+        reference_counts = Counter(i for inputs in dependencies.values() for i in inputs)
+        pending = list(self.execution_order)
+        running = {}
+        spill_dir = tempfile.mkdtemp(prefix='pipeline_', dir=self.spill_dir) if self.spill_dir is not None else None
+
+        try:
+            with self.__create_executor() as executor:
+                while pending or running:
+                    ready = [index for index in pending if all(i in results for i in dependencies[index])]
+                    for index in ready:
+                        pending.remove(index)
+                        params = [results[i].load() if isinstance(results[i], SpilledResult) else results[i]
+                                  for i in dependencies[index]]
+                        running[self.__start_filter(self.__filter_by_index(index), params, executor)] = index
+                        for i in dependencies[index]:
+                            reference_counts[i] -= 1
+                            if not reference_counts[i] and self.release_intermediate_results:
+                                self.__release_result(results, i)
+                        del params
+
+                    if spill_dir is not None:
+                        for index, result in list(results.items()):
+                            if reference_counts[index] and not isinstance(result, SpilledResult):
+                                self.__spill_result(results, index, spill_dir)
+
+                    finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for future in finished:
+                        index = running.pop(future)
+                        try:
+                            results[index] = self.__filter_result(index, future)
+                        except FilterExecutionError:
+                            # Filters still running cannot produce a usable result any more.
+                            for running_future in running:
+                                running_future.cancel()
+                            raise
+                        if not reference_counts[index] and index != final_index and self.release_intermediate_results:
+                            self.__release_result(results, index)
+        finally:
+            if spill_dir is not None:
+                shutil.rmtree(spill_dir, ignore_errors=True)
+
+        return results[final_index]
+
+    def __run_barrier(self, index: int, pipeline_filter: BasicFilter, link_objects: Iterable[dict],
+                      params: list[list[dict]]) -> Iterator[dict]:
+        try:
+            result = execute_filter(pipeline_filter, [list(link_objects), *params])
+        except Exception as e:
+            raise FilterExecutionError(index, pipeline_filter, f"failed: {e!r}") from e
+        if result is None:
+            raise FilterExecutionError(index, pipeline_filter, "returned no result")
+        yield from result
+
+    def __stream_output(self, index: int, reference_counts: Counter, materialized: dict) -> Iterable[dict]:
+        if index in materialized:
+            return materialized[index]
+        if index == 0:
+            return self.base_link_objects
+
+        filter_receive_indexes = next(inputs for filter_index, inputs, _ in self.filters if filter_index == index)
+        pipeline_filter = self.__filter_by_index(index)
+        link_objects = self.__stream_output(filter_receive_indexes[0], reference_counts, materialized)
+        params = [self.__materialize_output(i, reference_counts, materialized) for i in filter_receive_indexes[1:]]
+        if pipeline_filter.streaming:
+            output = pipeline_filter.stream(link_objects, *params)
+        else:
+            output = self.__run_barrier(index, pipeline_filter, link_objects, params)
+
+        # Outputs read by several filters cannot be shared as a single generator.
+        if reference_counts[index] > 1:
+            output = materialized[index] = list(output)
+        return output
+
+    def __materialize_output(self, index: int, reference_counts: Counter, materialized: dict) -> list[dict]:
+        output = self.__stream_output(index, reference_counts, materialized)
+        if not isinstance(output, Sequence):
+            output = materialized[index] = list(output)
+        return output
+
+    def stream(self) -> Iterator[dict]:
+        """Lazily yields the final filter's rows, only materializing barrier filters and shared outputs."""
+        reference_counts = Counter(i for _, inputs, _ in self.filters for i in inputs)
+        yield from self.__stream_output(self.filters[-1][0], reference_counts, {})
@@ -0,0 +1,117 @@
+from functools import lru_cache
+from typing import Iterable, NamedTuple
+from urllib.parse import urlsplit
+
+from .link_batch import LinkBatch
+
+import os
+import yaml
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE_PATH = os.path.join(APP_DIR, 'config.yaml')
+
+with open(CONFIG_FILE_PATH, 'r') as file:
+    config: dict = yaml.safe_load(file)
+
+URL_CACHE_SIZE: int = config['url_normalization']['cache_size']
+PUBLIC_SUFFIX_FILE_PATH: str = os.path.join(APP_DIR, config['url_normalization']['public_suffix_file'])
+
+
+class ParsedUrl(NamedTuple):
+    scheme: str
+    host: str
+    domain: str
+    path: str
+
+
+class PublicSuffixList:
+    """Public suffix rules in the publicsuffix.org format, including wildcard and exception rules."""
+
+    def __init__(self, rules: Iterable[str]):
+        self.rules = set()
+        self.wildcard_rules = set()
+        self.exception_rules = set()
+        for rule in rules:
+            rule = rule.strip().lower()
+            if not rule or rule.startswith('//'):
+                continue
+            rule = rule.split()[0]
+            if rule.startswith('!'):
+                self.exception_rules.add(rule[1:])
+            elif rule.startswith('*.'):
+                self.wildcard_rules.add(rule[2:])
+            else:
+                self.rules.add(rule)
+
+    @classmethod
+    def from_file(cls, filepath: str) -> 'PublicSuffixList':
+        with open(filepath, 'r', encoding='utf-8') as suffix_file:
+            return cls(suffix_file)
+
+    def public_suffix_length(self, labels: list[str]) -> int:
+        """Returns how many trailing labels of the host form its public suffix."""
+        for index in range(len(labels)):
+            candidate = '.'.join(labels[index:])
+            if candidate in self.exception_rules:
+                return len(labels) - index - 1
+            if index and candidate in self.wildcard_rules:
+                return len(labels) - index + 1
+            if candidate in self.rules:
+                return len(labels) - index
+        # Hosts without a matching rule fall back to the implicit "*" rule: the last label is the suffix.
+        return 1
+
+    def registrable_domain(self, host: str) -> str:
+        labels = host.split('.')
+        if len(labels) < 2 or host.replace('.', '').isdigit() or ':' in host:
+            return host
+        public_suffix_length = self.public_suffix_length(labels)
+        if public_suffix_length >= len(labels):
+            return host
+        return '.'.join(labels[-public_suffix_length - 1:])
+
+
+PUBLIC_SUFFIX_LIST = PublicSuffixList.from_file(PUBLIC_SUFFIX_FILE_PATH)
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def parse_url(url: str) -> ParsedUrl:
+    split_url = urlsplit(url)
+    host = (split_url.hostname or '').rstrip('.')
+    path = f"{split_url.path}?{split_url.query}" if split_url.query else split_url.path
+    return ParsedUrl(split_url.scheme, host, PUBLIC_SUFFIX_LIST.registrable_domain(host), path)
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a url for use as a cache key: lowercase scheme and host, no default port or fragment."""
+    split_url = urlsplit(url.strip())
+    scheme = split_url.scheme.lower()
+    host = (split_url.hostname or '').rstrip('.')
+    port = split_url.port
+    netloc = host if port is None or (scheme, port) in (('http', 80), ('https', 443)) else f"{host}:{port}"
+    path = split_url.path or '/'
+    return f"{scheme}://{netloc}{path}?{split_url.query}" if split_url.query else f"{scheme}://{netloc}{path}"
+
+
+def strip_host_prefix(url: str, prefix: str) -> str:
+    """Removes a prefix such as "www." from the host of the url, leaving the path and query untouched."""
+    scheme_end = url.find('//')
+    if scheme_end < 0:
+        return url
+    host_start = scheme_end + 2
+    if url[host_start:host_start + len(prefix)].lower() == prefix.lower():
+        return url[:host_start] + url[host_start + len(prefix):]
+    return url
+
+
+def link_domain(link_object: dict, url_column_name: str, domain_column_name: str = None) -> str:
+    """Returns the precomputed domain of a link object, parsing its url only when the domain is missing."""
+    if domain_column_name and domain_column_name in link_object:
+        return link_object[domain_column_name]
+    return parse_url(link_object[url_column_name]).domain
+
+
+def domain_values(link_objects: Iterable[dict], url_column_name: str, domain_column_name: str = None) -> list[str]:
+    if isinstance(link_objects, LinkBatch) and domain_column_name in link_objects.columns:
+        return link_objects.column(domain_column_name)
+    return [link_domain(link_object, url_column_name, domain_column_name) for link_object in link_objects]
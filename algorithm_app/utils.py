@@ -1,26 +1,63 @@
 import re
-from typing import Any
+from itertools import islice
+from typing import Any, Iterable, Iterator
 
 import os
 import time
+import asyncio
 import json
 import logging
 import pandas as pd
 
+from .link_batch import LinkBatch
+
+
+def clean_text(text: str) -> str:
+    """Keeps only the printable ASCII characters, the form page texts take from extraction on."""
+    return re.sub(r'[^\x20-\x7E]', '', text)
+
+
+def timed(func) -> Any:
+    """Reports the time taken by a function or coroutine function, letting its exceptions reach the caller."""
+    def report(start_time: float) -> None:
+        end_time = time.time()
+        print(f'Total time taken for {func.__name__} - {end_time-start_time} seconds')
+        logging.info(f'Total time taken for {func.__name__} - {end_time-start_time} seconds')
 
-def annotate(func) -> Any:
     def wrapper(*args, **kwargs):
         start_time = time.time()
         try:
-            result = func(*args, **kwargs)
+            return func(*args, **kwargs)
+        finally:
+            report(start_time)
+
+    async def async_wrapper(*args, **kwargs):
+        start_time = time.time()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            report(start_time)
+    return async_wrapper if asyncio.iscoroutinefunction(func) else wrapper
+
+
+def annotate(func) -> Any:
+    """Reports the time taken like timed, but logs exceptions and returns None instead of raising them."""
+    timed_func = timed(func)
+
+    def wrapper(*args, **kwargs):
+        try:
+            return timed_func(*args, **kwargs)
         except Exception as e:
             logging.error(f"Error in {func.__name__}: {e}")
-            result = None
-        end_time = time.time()
-        print(f'Total time taken for {func.__name__} - {end_time-start_time} seconds')
-        logging.info(f'Total time taken for {func.__name__} - {end_time-start_time} seconds')
-        return result
-    return wrapper
+            return None
+
+    async def async_wrapper(*args, **kwargs):
+        try:
+            return await timed_func(*args, **kwargs)
+        except Exception as e:
+            logging.error(f"Error in {func.__name__}: {e}")
+            return None
+    return async_wrapper if asyncio.iscoroutinefunction(func) else wrapper
 
 
 @annotate
@@ -33,12 +70,13 @@ def initialize_run(run_dir: str, webcrawler_dir: str, analyser_dir: str, log_fil
 
 
 @annotate
-def append_to_json_file(data: list[dict], filepath: str) -> Any:
+def append_to_json_file(data: Iterable[dict], filepath: str) -> Any:
     try:
         with open(filepath, 'a') as file:
             for row in data:
                 json.dump(row, file)
                 file.write('\n')
+                file.flush()
     except Exception as e:
         print(f"Error writing to the JSON file: {e}")
 
@@ -56,6 +94,19 @@ def read_from_ndjson_file(filepath: str) -> list[dict]:
         return data
 
 
+@annotate
+def read_link_batch_from_ndjson_file(filepath: str, interned_column_names: Iterable[str] = ()) -> LinkBatch:
+    data = LinkBatch(interned_column_names=interned_column_names)
+    try:
+        with open(filepath, 'r') as f:
+            for line in f:
+                data.append(json.loads(line))
+    except Exception as e:
+        print(f"Error reading the JSON file: {e}")
+    finally:
+        return data
+
+
 @annotate
 def read_from_json_file(filepath: str) -> dict:
     data = ''
@@ -68,6 +119,12 @@ def read_from_json_file(filepath: str) -> dict:
         return data
 
 
+def batched(iterable: Iterable, batch_size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
 def clean_text(text):
     return re.sub(r'[^\x20-\x7E]', '', text)
 
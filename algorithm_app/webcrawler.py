@@ -1,6 +1,7 @@
 import os
 
 from .utils import append_to_json_file, annotate
+from .url_normalization import parse_url
 from typing import Any
 from selenium import webdriver
 from selenium.common import TimeoutException, ElementClickInterceptedException
@@ -321,7 +322,7 @@ class SieveWebCrawler:
         self.decline_cookies()
         time.sleep(1)
         link_objects: list[dict] = []
-        urls_processed: list = []
+        domain_link_objects: dict[str, dict] = {}
         current_search_page = 1
         while current_search_page <= SEARCH_PAGES:
             time.sleep(1)
@@ -331,15 +332,12 @@ class SieveWebCrawler:
             for result in results:
                 link = self._decode_bing_url(result.get_attribute("href"))
                 if link:
-                    domain_part = link.split("/")[2]
-                    if not urls_processed.__contains__(domain_part):
-                        link_objects.append({'url': link, 'num_occurrences': 1})
-                        urls_processed.append(domain_part)
+                    domain_part = parse_url(link).domain
+                    if domain_part not in domain_link_objects:
+                        domain_link_objects[domain_part] = {'url': link, 'num_occurrences': 1}
+                        link_objects.append(domain_link_objects[domain_part])
                     else:
-                        for link_object in link_objects:
-                            if link_object['url'].__contains__(domain_part):
-                                link_object['num_occurrences'] += 1
-                                break
+                        domain_link_objects[domain_part]['num_occurrences'] += 1
             print([link_object['url'] for link_object in link_objects])
 
             try:
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+from algorithm_app.filters.basic_filter import BasicFilter, with_fields
+from algorithm_app.filters.domain_enrichment_filter import DomainEnrichmentFilter
+from algorithm_app.filters.enrichment_store import DomainEnrichmentStore
+
+
+class RecordingFilter(BasicFilter):
+    """
+    Adds a field to every link object and records the size of every batch it is given. Streams in batches of 50,
+    like the network filters, so streaming through it shows up as several batches.
+    """
+    streaming = True
+
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+
+    def run(self, link_objects: list[dict]) -> list[dict]:
+        self.batch_sizes.append(len(link_objects))
+        return super().run([with_fields(link_object, {"title": link_object["url"].upper()})
+                            for link_object in link_objects])
+
+    def stream(self, link_objects):
+        link_objects = list(link_objects)
+        for start in range(0, len(link_objects), 50):
+            yield from self.run(link_objects[start:start + 50])
+
+
+class ThreadRecordingFilter(RecordingFilter):
+    """Synchronous filter that records the threads it runs in."""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def run(self, link_objects: list[dict]) -> list[dict]:
+        self.threads.add(threading.get_ident())
+        return super().run(link_objects)
+
+
+def test_run_passes_every_missing_row_to_the_chain_at_once(tmp_path):
+    store = DomainEnrichmentStore(str(tmp_path / 'enrichment.sqlite3'), ttl=3600)
+    store.put('cached.com', {"title": "Stored"})
+    recording_filter = RecordingFilter()
+    link_objects = [{"url": f"https://site{i}.com/"} for i in range(120)]
+    link_objects.insert(60, {"url": "https://cached.com/"})
+
+    result = DomainEnrichmentFilter([recording_filter], store, "url").run(link_objects)
+
+    assert recording_filter.batch_sizes == [120]
+    assert [link_object["url"] for link_object in result] == [link_object["url"] for link_object in link_objects]
+    assert result[60]["title"] == "Stored"
+    assert result[0]["title"] == "HTTPS://SITE0.COM/"
+    assert store.get('site0.com') == {"title": "HTTPS://SITE0.COM/"}
+
+
+class ThreadRecordingStore(DomainEnrichmentStore):
+    """Enrichment store that records the threads it is queried from."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+
+    def get(self, domain: str) -> dict | None:
+        self.threads.add(threading.get_ident())
+        return super().get(domain)
+
+    def put(self, domain: str, fields: dict) -> None:
+        self.threads.add(threading.get_ident())
+        super().put(domain, fields)
+
+
+def test_arun_keeps_store_queries_and_synchronous_filters_off_the_event_loop(tmp_path):
+    store = ThreadRecordingStore(str(tmp_path / 'enrichment.sqlite3'), ttl=3600)
+    store.put('cached.com', {"title": "Stored"})
+    store.threads.clear()
+    recording_filter = ThreadRecordingFilter()
+    link_objects = [{"url": "https://cached.com/"}, {"url": "https://site.com/"}]
+
+    async def enrich() -> tuple[int, list[dict]]:
+        return threading.get_ident(), await DomainEnrichmentFilter([recording_filter], store, "url").arun(link_objects)
+
+    loop_thread, result = asyncio.run(enrich())
+
+    assert [link_object["title"] for link_object in result] == ["Stored", "HTTPS://SITE.COM/"]
+    assert store.threads and loop_thread not in store.threads
+    assert recording_filter.threads and loop_thread not in recording_filter.threads
+
+
+def test_chain_outputs_are_released(tmp_path):
+    store = DomainEnrichmentStore(str(tmp_path / 'enrichment.sqlite3'), ttl=3600)
+    link_objects = [{"url": f"https://site{i}.com/"} for i in range(3)]
+    for enrichment_store in (store, None):
+        chain = [RecordingFilter(), RecordingFilter()]
+        domain_enrichment_filter = DomainEnrichmentFilter(chain, enrichment_store, "url")
+        assert len(domain_enrichment_filter.run(link_objects)) == 3
+        assert [pipeline_filter.result_link_objects for pipeline_filter in chain] == [None, None]
+        assert len(list(domain_enrichment_filter.stream(link_objects))) == 3
+        assert [pipeline_filter.result_link_objects for pipeline_filter in chain] == [None, None]
@@ -0,0 +1,37 @@
+from algorithm_app.filters import (BlacklistFilter, DeduplicationFilter, FusedFilter, LocationGroupingFilter,
+                                   RegularizeLinksFilter)
+from algorithm_app.link_batch import LinkBatch
+from algorithm_app.pipeline import Pipeline
+
+ROWS = [
+    {'url': 'https://www.shop.com/', 'loc': 'London'},
+    {'url': 'https://shop.com/pos', 'loc': 'Madrid'},
+    {'url': 'https://www.reddit.com/r/shop', 'loc': 'London'},
+    {'url': 'https://www.tpv.es/', 'loc': 'Madrid'},
+    {'url': 'https://tpv.es/', 'loc': 'Lisbon'},
+]
+
+
+def grouping_filters() -> list:
+    return [
+        [1, [0], RegularizeLinksFilter('url', 'www.', 'domain')],
+        [2, [1], LocationGroupingFilter('url', 'loc', 'domain')],
+        [3, [2], BlacklistFilter('url')],
+        [4, [3], DeduplicationFilter('url', 'domain')],
+    ]
+
+
+def test_fused_blacklist_and_deduplication_keep_link_batches():
+    link_batch = LinkBatch.from_records(ROWS, ['loc', 'domain'])
+    pipeline = Pipeline(grouping_filters(), link_batch)
+    assert any(isinstance(pipeline_filter, FusedFilter) for _, _, pipeline_filter in pipeline.filters)
+    fused_result = pipeline.run()
+    unfused_result = Pipeline(grouping_filters(), link_batch, fuse_row_filters=False).run()
+    assert isinstance(fused_result, LinkBatch)
+    assert list(fused_result) == list(unfused_result)
+    assert [link_object['url'] for link_object in fused_result] == ['https://shop.com/', 'https://tpv.es/']
+
+
+def test_fused_filter_over_records_matches_unfused():
+    pipeline = Pipeline(grouping_filters(), ROWS)
+    assert pipeline.run() == Pipeline(grouping_filters(), ROWS, fuse_row_filters=False).run()
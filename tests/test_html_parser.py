@@ -0,0 +1,29 @@
+import pytest
+
+from algorithm_app.filters import request_adapter
+from algorithm_app.filters.html_parser import (get_parser_pool, parse_website_data, resolve_parser_backend,
+                                               shutdown_parser_pool)
+
+HTML = '''<html><head><title>Sistema TPV</title><meta name="description" content="Software para tiendas"></head>
+<body><h1>Contacto</h1><p>Llámenos al +34 912 345 678</p><a href="/contacto">Contacto</a><p>Unclosed <b>tag</body>'''
+
+
+def test_default_backend_is_html_parser():
+    assert request_adapter.PARSER_BACKEND == 'html.parser'
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_parser_backend('html5lib')
+
+
+def test_parser_pool_matches_inline_parsing():
+    expected = parse_website_data(HTML, 'html.parser', 'https://tpv.es/', ('contact',))
+    try:
+        pool = get_parser_pool(1)
+        assert pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+        assert pool.submit(parse_website_data, HTML, 'html.parser', 'https://tpv.es/', ('contact',)).result() == expected
+    finally:
+        shutdown_parser_pool()
+    assert expected.title == 'Sistema TPV'
+    assert expected.description == 'Software para tiendas'
@@ -0,0 +1,99 @@
+import zlib
+import asyncio
+import hashlib
+
+import pytest
+from aiohttp import web
+
+from algorithm_app.filters import request_adapter
+from algorithm_app.filters.http_cache import HttpCache
+from algorithm_app.filters.request_adapter import RequestAdapter
+
+
+def page(number: int) -> str:
+    # Hashes compress alike, so every page takes about the same share of the size limit.
+    filler = ''.join(hashlib.sha256(f'{number}-{i}'.encode()).hexdigest() for i in range(64))
+    return f'<html><head><title>Page {number}</title></head><body><p>{filler}</p></body></html>'
+
+
+@pytest.fixture(autouse=True)
+def inline_parsing(monkeypatch):
+    monkeypatch.setitem(request_adapter.HTML_PARSER, 'process_pool', False)
+
+
+async def fetch_with_stand_in(urls_count: int, runs: list[HttpCache]) -> tuple[list[list[dict]], list]:
+    """Serves numbered pages with an ETag and fetches them once per given cache, returning results and requests."""
+    requests = []
+
+    async def handler(request: web.Request) -> web.Response:
+        number = int(request.match_info['number'])
+        requests.append((number, request.headers.get('If-None-Match')))
+        etag = f'"v{number}"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(text=page(number), content_type='text/html', headers={'ETag': etag})
+
+    app = web.Application()
+    app.router.add_get('/page/{number}', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        links = [f'http://127.0.0.1:{port}/page/{number}' for number in range(urls_count)]
+        results = [await RequestAdapter(links, http_cache=http_cache).arun() for http_cache in runs]
+    finally:
+        await runner.cleanup()
+    return results, requests
+
+
+def test_fresh_entries_are_served_without_requests(tmp_path):
+    http_cache = HttpCache(str(tmp_path), ttl=3600, max_size_bytes=10 * 1024 * 1024)
+    (first, second), requests = asyncio.run(fetch_with_stand_in(3, [http_cache, http_cache]))
+    assert len(requests) == 3
+    assert second == first
+    assert [website['title'] for website in second] == ['Page 0', 'Page 1', 'Page 2']
+    assert http_cache.hits == 3
+    assert http_cache.misses == 3
+
+
+def test_stale_entries_are_revalidated(tmp_path):
+    http_cache = HttpCache(str(tmp_path), ttl=0, max_size_bytes=10 * 1024 * 1024)
+    (first, second), requests = asyncio.run(fetch_with_stand_in(2, [http_cache, http_cache]))
+    assert sorted(requests, key=str) == [(0, '"v0"'), (0, None), (1, '"v1"'), (1, None)]
+    assert second == first
+    assert http_cache.revalidations == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    page_size = len(zlib.compress(page(0).encode('utf-8')))
+    http_cache = HttpCache(str(tmp_path), ttl=3600, max_size_bytes=3 * page_size)
+    asyncio.run(fetch_with_stand_in(6, [http_cache]))
+    assert http_cache.evictions >= 3
+    assert 0 < http_cache.size() <= 3 * page_size
+    http_cache.close()
+    # The byte counter is rebuilt from the index when the cache is opened again.
+    reopened = HttpCache(str(tmp_path), ttl=3600, max_size_bytes=3 * page_size)
+    assert reopened.size() == http_cache.size()
+
+
+def test_truncated_bodies_are_only_served_to_the_same_read_limits(tmp_path):
+    http_cache = HttpCache(str(tmp_path), ttl=3600, max_size_bytes=10 * 1024 * 1024)
+    http_cache.put('https://tpv.es/', 200, {}, '<html><head>', 'max_bytes=12;head_only=False')
+    http_cache.put('https://shop.com/', 200, {}, '<html></html>')
+    assert http_cache.get('https://tpv.es/') is None
+    assert http_cache.get('https://tpv.es/', 'max_bytes=262144;head_only=False') is None
+    assert http_cache.get('https://tpv.es/', 'max_bytes=12;head_only=False').body == '<html><head>'
+    assert http_cache.get('https://shop.com/', 'max_bytes=12;head_only=False').body == '<html></html>'
+
+
+def test_truncated_responses_are_cached_with_their_read_limits(tmp_path, monkeypatch):
+    monkeypatch.setitem(request_adapter.STREAMING_FETCH, 'max_bytes', 100)
+    http_cache = HttpCache(str(tmp_path), ttl=3600, max_size_bytes=10 * 1024 * 1024)
+    _, requests = asyncio.run(fetch_with_stand_in(1, [http_cache, http_cache]))
+    assert len(requests) == 1
+    monkeypatch.setitem(request_adapter.STREAMING_FETCH, 'max_bytes', 1000)
+    (result,), requests = asyncio.run(fetch_with_stand_in(1, [http_cache]))
+    assert len(requests) == 1
+    assert result[0]['title'] == 'Page 0'
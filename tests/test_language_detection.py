@@ -0,0 +1,49 @@
+import os
+
+from algorithm_app.filters.translation_filter import LANGUAGE_DETECTION, TARGET_LANGUAGE
+from algorithm_app.language_detection import load_language_detector
+from algorithm_app.utils import clean_text
+
+LABELLED_TITLES_FILE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'labelled_titles.txt')
+
+
+def read_labelled_titles() -> list[tuple[str, str]]:
+    """Returns the labelled titles as extraction hands them on, without their non-ASCII characters."""
+    labelled_titles = []
+    language = None
+    with open(LABELLED_TITLES_FILE_PATH, 'r', encoding='utf-8') as labelled_titles_file:
+        for line in labelled_titles_file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                language = line[1:-1]
+            else:
+                labelled_titles.append((language, clean_text(line)))
+    return labelled_titles
+
+
+def test_detects_the_language_of_labelled_titles():
+    detector = load_language_detector()
+    detections = [(language, detector.detect(text)) for language, text in read_labelled_titles()]
+    confident = [(language, detected) for language, detected in detections
+                 if detected.confidence >= LANGUAGE_DETECTION['min_confidence']]
+    assert sum(detected.language == language for language, detected in detections) / len(detections) >= 0.95
+    assert len(confident) / len(detections) >= 0.85
+    assert sum(detected.language == language for language, detected in confident) / len(confident) >= 0.98
+
+
+def test_never_takes_other_languages_for_the_target_language():
+    detector = load_language_detector()
+    for language, text in read_labelled_titles():
+        detected = detector.detect(text)
+        if language != TARGET_LANGUAGE and detected.confidence >= LANGUAGE_DETECTION['min_confidence']:
+            assert detected.language != TARGET_LANGUAGE, text
+
+
+def test_short_business_titles():
+    detector = load_language_detector()
+    english = detector.detect('Best Plumbing Services in London | Emergency Repairs')
+    assert english.language == 'en'
+    assert english.confidence >= LANGUAGE_DETECTION['min_confidence']
+    assert detector.detect('Klempner Berlin Notdienst').language == 'de'
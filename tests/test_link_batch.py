@@ -0,0 +1,33 @@
+from algorithm_app.filters import (BlacklistFilter, CheckMetadataFilter, DeduplicationFilter, LocationGroupingFilter,
+                                   MatchOccurrencesCountFilter, OccurrencesCountFilter, RegularizeLinksFilter)
+from algorithm_app.link_batch import LinkBatch
+from algorithm_app.pipeline import Pipeline
+from algorithm_app.utils import read_link_batch_from_ndjson_file
+
+
+def analyser_filters() -> list:
+    return [
+        [1, [0], RegularizeLinksFilter('url', 'www.', 'domain')],
+        [2, [1], OccurrencesCountFilter('url', 'num_occurrences', 'domain')],
+        [3, [1], LocationGroupingFilter('url', 'loc', 'domain')],
+        [4, [3], BlacklistFilter('url')],
+        [5, [4], DeduplicationFilter('url', 'domain')],
+        [6, [5, 2], MatchOccurrencesCountFilter('url', 'num_occurrences', 'loc', 'domain')],
+        [7, [6], CheckMetadataFilter(['pos'])],
+    ]
+
+
+def test_empty_batch_has_empty_columns():
+    assert LinkBatch().column('url') == []
+
+
+def test_regularize_links_accepts_empty_batch():
+    result = RegularizeLinksFilter('url', 'www.', 'domain').run(LinkBatch())
+    assert isinstance(result, LinkBatch)
+    assert len(result) == 0
+
+
+def test_pipeline_over_missing_crawl_file_writes_empty_result(tmp_path):
+    link_batch = read_link_batch_from_ndjson_file(str(tmp_path / 'missing.json'), ['loc', 'domain'])
+    assert Pipeline(analyser_filters(), link_batch).run() == []
+    assert list(Pipeline(analyser_filters(), link_batch).stream()) == []
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from algorithm_app.filters import BasicFilter
+from algorithm_app.pipeline import FilterExecutionError, Pipeline
+
+
+class CountingFilter(BasicFilter):
+    def __init__(self):
+        super().__init__()
+        self.rows_seen = 0
+
+    def run(self, link_objects: list[dict]) -> list[dict]:
+        self.rows_seen += len(link_objects)
+        return super().run([{**link_object, 'seen': True} for link_object in link_objects])
+
+
+class FailingFilter(BasicFilter):
+    def run(self, link_objects: list[dict]) -> list[dict]:
+        raise KeyError('url')
+
+
+class NoResultFilter(BasicFilter):
+    def run(self, link_objects: list[dict]) -> list[dict]:
+        return None
+
+
+class UnpicklableFilter(BasicFilter):
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+
+
+ROWS = [{'url': f'https://site{index}.com/'} for index in range(5)]
+
+
+@pytest.mark.parametrize('executor_type', ['sequential', 'thread'])
+def test_failing_filter_stops_the_run_with_its_index(executor_type):
+    filters = [[1, [0], CountingFilter()], [2, [1], FailingFilter()], [3, [2], CountingFilter()]]
+    with pytest.raises(FilterExecutionError, match=r'filter 2 \(FailingFilter\) failed') as error:
+        Pipeline(filters, ROWS, executor_type, fuse_row_filters=False).run()
+    assert error.value.index == 2
+    assert filters[2][2].rows_seen == 0
+
+
+def test_filter_without_result_stops_the_run():
+    filters = [[1, [0], NoResultFilter()], [2, [1], CountingFilter()]]
+    with pytest.raises(FilterExecutionError, match='returned no result'):
+        Pipeline(filters, ROWS).run()
+
+
+def test_streaming_barrier_failure_names_the_filter():
+    filters = [[1, [0], CountingFilter()], [2, [1], FailingFilter()]]
+    with pytest.raises(FilterExecutionError, match=r'filter 2'):
+        list(Pipeline(filters, ROWS).stream())
+
+
+def test_process_executor_rejects_unpicklable_filters():
+    with pytest.raises(ValueError, match=r'filter 1 \(UnpicklableFilter\) cannot run on the process executor'):
+        Pipeline([[1, [0], UnpicklableFilter()]], ROWS, 'process')
+
+
+def test_process_executor_keeps_filter_state():
+    counting_filter = CountingFilter()
+    result = Pipeline([[1, [0], counting_filter]], ROWS, 'process', max_workers=1).run()
+    assert [link_object['seen'] for link_object in result] == [True] * len(ROWS)
+    assert counting_filter.rows_seen == len(ROWS)
+    assert counting_filter.result_link_objects == result
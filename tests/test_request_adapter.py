@@ -0,0 +1,65 @@
+import time
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from algorithm_app.filters import request_adapter
+from algorithm_app.filters.http_cache import HttpCache
+from algorithm_app.filters.request_adapter import RequestAdapter
+
+LANDING_PAGE = '''<html><head><title>Fontanería Pérez</title></head>
+<body><p>Reparaciones urgentes</p><a href="/contacto">Contacto</a></body></html>'''
+
+
+@pytest.fixture(autouse=True)
+def site_crawl(monkeypatch):
+    monkeypatch.setitem(request_adapter.HTML_PARSER, 'process_pool', False)
+    monkeypatch.setitem(request_adapter.SITE_CRAWL, 'enabled', True)
+
+
+async def landing_page(request: web.Request) -> web.Response:
+    return web.Response(text=LANDING_PAGE, content_type='text/html')
+
+
+async def broken_contact_page(request: web.Request) -> web.Response:
+    # Decoding the body with an unknown charset fails outside of aiohttp.
+    return web.Response(body=b'<html><body>+34 912 345 678</body></html>',
+                        headers={'Content-Type': 'text/html; charset=unknown-charset'})
+
+
+async def slow_contact_page(request: web.Request) -> web.Response:
+    await asyncio.sleep(2)
+    return web.Response(text='<html><body>+34 912 345 678</body></html>', content_type='text/html')
+
+
+async def fetch_site(tmp_path, contact_page, deadline: float = None) -> tuple[RequestAdapter, list[dict]]:
+    app = web.Application()
+    app.router.add_get('/', landing_page)
+    app.router.add_get('/contacto', contact_page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        adapter = RequestAdapter([f'http://127.0.0.1:{port}/'], http_cache=HttpCache(str(tmp_path), 3600, 1024 * 1024),
+                                 deadline=time.monotonic() + deadline if deadline is not None else None)
+        return adapter, await adapter.arun()
+    finally:
+        await runner.cleanup()
+
+
+def test_failing_contact_page_keeps_the_landing_page(tmp_path):
+    adapter, (website_data,) = asyncio.run(fetch_site(tmp_path, broken_contact_page))
+    assert website_data['title'] == 'Fontanería Pérez'
+    assert website_data['text'] == 'Reparaciones urgentes'
+    assert adapter.other_errors == 1
+    assert adapter.crawled_sites == 1
+
+
+def test_deadline_during_the_contact_crawl_keeps_the_landing_page(tmp_path):
+    adapter, (website_data,) = asyncio.run(fetch_site(tmp_path, slow_contact_page, deadline=0.5))
+    assert website_data['title'] == 'Fontanería Pérez'
+    assert website_data['text'] == 'Reparaciones urgentes'
+    assert adapter.not_fetched == 0
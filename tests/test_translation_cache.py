@@ -0,0 +1,24 @@
+import sqlite3
+
+from algorithm_app.filters.translation_cache import TranslationCache, translation_key
+
+
+def stored_access_time(database_path: str, text: str) -> float:
+    with sqlite3.connect(database_path) as connection:
+        return connection.execute('SELECT accessed_at FROM translations WHERE translation_key = ?',
+                                  (translation_key(text, 'auto', 'en', 'dictionary'),)).fetchone()[0]
+
+
+def test_access_times_of_disk_hits_are_written_back_in_batches(tmp_path):
+    database_path = str(tmp_path / 'translations.sqlite3')
+    translation_cache = TranslationCache(database_path, 0, 1000)
+    translation_cache.put('Fontanera urgente', 'auto', 'en', 'dictionary', 'Urgent plumbing')
+    stored_at = stored_access_time(database_path, 'Fontanera urgente')
+
+    assert translation_cache.get('Fontanera urgente', 'auto', 'en', 'dictionary') == 'Urgent plumbing'
+    assert translation_cache.disk_hits == 1
+    assert stored_access_time(database_path, 'Fontanera urgente') == stored_at
+
+    translation_cache.flush()
+    assert stored_access_time(database_path, 'Fontanera urgente') > stored_at
+    translation_cache.close()
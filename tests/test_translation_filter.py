@@ -0,0 +1,65 @@
+from algorithm_app.filters.translation_backends import DictionaryTranslationBackend
+from algorithm_app.filters.translation_cache import TranslationCache
+from algorithm_app.filters.translation_filter import TranslationFilter
+from algorithm_app.utils import clean_text
+
+
+class RecordingBackend(DictionaryTranslationBackend):
+    """Dictionary backend that records the texts of every request."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests = []
+
+    async def translate_batch(self, texts: list[str], source_language: str, target_language: str) -> list[str]:
+        self.requests.append(list(texts))
+        return await super().translate_batch(texts, source_language, target_language)
+
+
+def create_translation_filter(tmp_path, backend: DictionaryTranslationBackend) -> TranslationFilter:
+    translation_cache = TranslationCache(str(tmp_path / 'translations.sqlite3'), 100, 1000)
+    return TranslationFilter('url', translation_cache=translation_cache, backend=backend)
+
+
+def test_texts_in_the_target_language_are_not_translated(tmp_path):
+    backend = RecordingBackend({'Klempner': 'Plumber', 'Notdienst': 'emergency service'})
+    link_objects = [
+        {'url': 'https://plumbers.co.uk/', 'title': 'Best Plumbing Services in London | Emergency Repairs',
+         'description': 'Boiler repairs and bathroom fitting across North London'},
+        {'url': 'https://klempner.de/', 'title': 'Klempner Berlin Notdienst',
+         'description': 'Rohrreinigung und Heizungsreparatur rund um die Uhr'},
+        {'url': 'https://tpv.es/', 'title': 'TPV', 'description': 'Sistemas de punto de venta para comercios'},
+    ]
+
+    translation_filter = create_translation_filter(tmp_path, backend)
+    result = translation_filter.run(link_objects)
+
+    requested_texts = [text for request in backend.requests for text in request]
+    assert sorted(requested_texts) == ['Klempner Berlin Notdienst', 'Rohrreinigung und Heizungsreparatur rund um die Uhr',
+                                       'Sistemas de punto de venta para comercios']
+    assert [link_object['language'] for link_object in result][:2] == ['en', 'de']
+    assert result[0]['description'] == 'Boiler repairs and bathroom fitting across North London'
+    assert result[1]['title'] == 'Plumber Berlin emergency service'
+    assert result[2]['title'] == 'TPV'
+    assert translation_filter.skipped_texts == 3
+
+
+def test_dictionary_backend_translates_deterministically_in_packed_requests(tmp_path):
+    dictionary = {'Fontanera': 'Plumbing', 'urgente': 'emergency', 'Sistema': 'System', 'tienda': 'shop'}
+    link_objects = [
+        # Extraction drops non-ASCII characters before texts reach the translation filter.
+        {'url': f'https://site{index}.es/', 'title': clean_text(f'Fontanería urgente número {index}'),
+         'description': clean_text(f'Sistema de gestión para la tienda número {index}')} for index in range(30)
+    ]
+
+    results = []
+    for run_dir in ('first', 'second'):
+        backend = RecordingBackend(dictionary, max_batch_items=25)
+        results.append(create_translation_filter(tmp_path / run_dir, backend).run(link_objects))
+        # 60 distinct texts are packed into requests of at most 25 texts each.
+        assert [len(request) for request in backend.requests] == [25, 25, 10]
+
+    assert results[0] == results[1]
+    assert results[0][7]['title'] == 'Plumbing emergency nmero 7'
+    assert results[0][7]['description'] == 'System de gestin para la shop nmero 7'
+    assert results[0][7]['language'] == 'es'
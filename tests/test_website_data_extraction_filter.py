@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from algorithm_app.filters import request_adapter
+from algorithm_app.filters.request_adapter import create_client_session
+from algorithm_app.filters.website_data_extraction_filter import WebsiteDataExtractionFilter
+
+
+@pytest.fixture(autouse=True)
+def without_http_cache(monkeypatch):
+    monkeypatch.setitem(request_adapter.HTML_PARSER, 'process_pool', False)
+    monkeypatch.setitem(request_adapter.HTTP_CACHE, 'enabled', False)
+
+
+async def extract_twice(share_session: bool) -> tuple[list[list[dict]], set]:
+    """Runs two filters on one event loop and returns their results and the client ports the server saw."""
+    client_ports = set()
+
+    async def handler(request: web.Request) -> web.Response:
+        client_ports.add(request.transport.get_extra_info('peername')[1])
+        return web.Response(text=f'<html><head><title>Shop {request.match_info["name"]}</title></head></html>',
+                            content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/{name}', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    session = create_client_session() if share_session else None
+    try:
+        results = []
+        for name in ('a', 'b'):
+            pipeline_filter = WebsiteDataExtractionFilter('url', 'occurrences', 'location', session=session)
+            results.append(await pipeline_filter.arun([{'url': f'http://127.0.0.1:{port}/{name}'}]))
+        if session is not None:
+            assert not session.closed
+    finally:
+        if session is not None:
+            await session.close()
+        await runner.cleanup()
+    return results, client_ports
+
+
+def test_filters_given_one_session_share_its_connections():
+    results, client_ports = asyncio.run(extract_twice(share_session=True))
+    assert [result[0]['title'] for result in results] == ['Shop a', 'Shop b']
+    assert len(client_ports) == 1
+
+
+def test_filters_without_a_session_open_their_own():
+    results, client_ports = asyncio.run(extract_twice(share_session=False))
+    assert [result[0]['title'] for result in results] == ['Shop a', 'Shop b']
+    assert len(client_ports) == 2